@@ -2,9 +2,21 @@ import pandas as pd
 import streamlit as st
 from streamlit_option_menu import option_menu
 import plotly.express as px
+import logging
+import os
 import warnings
 from PIL import Image
 
+from figure_cache import FigureCache
+from filter_index import FilterIndex
+from instrumentation import Instrumentation, Instrumented, logger as perf_logger, peak_rss_bytes, rss_bytes
+from geo import EXACT_ZOOM, MAX_POINTS, cells_figure, densest_centre, points_figure, view_bounds
+from query_backend import DuckDBBackend, MongoBackend, PandasBackend
+from ranking import RANKING_METRICS, TOP_N, RankingIndex
+from rollup import CubeStore
+from storage import DATASET_PATH, dataset_version, load_listings, partition_versions
+from table import LOCATION_TOP_N, PAGE_SIZES, TABLE_COLUMNS, price_bands
+
 
 def show_home():
     image = Image.open("images.jpg")
@@ -109,20 +121,156 @@ def show_about():
         Build a comprehensive dashboard using  Power BI, combining various visualizations to present key insights from the analysis. Provide a holistic view of the Airbnb dataset and its patterns.
     """)
 
+def show_diagnostics():
+    st.header("Diagnostics")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Resident memory", f"{(rss_bytes() or 0) / 2 ** 20:.0f} MB")
+    col2.metric("Peak memory", f"{(peak_rss_bytes() or 0) / 2 ** 20:.0f} MB")
+    col3.metric("Query backend", QUERY_BACKEND)
+    col4.metric("Dataset version", data_version)
+
+    st.subheader("Spans")
+    st.dataframe(pd.DataFrame(perf.summary()))
+
+    st.subheader("Figure payloads")
+    st.dataframe(pd.DataFrame(perf.sizes()))
+
+    st.subheader("Figure cache")
+    st.json(figure_cache.stats())
+
+    st.subheader("Recent spans")
+    st.dataframe(pd.DataFrame(perf.recent()[::-1]))
+
+    metrics = perf.prometheus(diagnostic_gauges())
+    st.download_button("Download Prometheus metrics", metrics, file_name="airbnb_metrics.prom")
+    with st.expander("Prometheus metrics"):
+        st.code(metrics)
+
 warnings.filterwarnings("ignore")
 st.set_page_config(layout="wide",page_icon="C:/Users/HameedS/Desktop/New folder/images.jpg")
 st.title("Airbnb Data Analysis")
 
 
 
-@st.cache_data
-def load_data(filepath):
-    return pd.read_csv(filepath)
+PRICE_LEVELS = ("country", "room_type", "property_type", "host_response_time")
+LOCATION_LEVELS = ("country", "property_type", "room_type")
+
+
+QUERY_BACKEND = os.environ.get("AIRBNB_QUERY_BACKEND", "pandas")
+
+MENU_OPTIONS = ["Home", "Data Exploration", "About"]
+
+
+@st.cache_resource
+def load_instrumentation():
+    if os.environ.get("AIRBNB_PERF_LOG"):
+        handler = logging.FileHandler(os.environ["AIRBNB_PERF_LOG"])
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        perf_logger.addHandler(handler)
+        perf_logger.setLevel(logging.INFO)
+    return Instrumentation(track_memory=os.environ.get("AIRBNB_PERF_MEMORY", "1") != "0")
+
+
+# Shared read-only by every session, like the indexes built from it; nothing may modify it in place
+@st.cache_resource(max_entries=2)
+def load_data(filepath, version):
+    with perf.span("load", step="dataset"):
+        return load_listings(filepath)
+
+
+@st.cache_resource(max_entries=4)
+def load_filter_index(version, levels, _df):
+    with perf.span("load", step="filter_index"):
+        return FilterIndex(_df, levels)
+
+
+@st.cache_resource(max_entries=2)
+def load_ranking_index(version, _df):
+    with perf.span("load", step="ranking_index"):
+        return RankingIndex(_df)
+
+
+@st.cache_resource
+def load_cube_store():
+    return CubeStore()
+
 
-df = load_data("Airbnbfinal.csv")
+@st.cache_resource
+def load_figure_cache():
+    return FigureCache(max_bytes=int(os.environ.get("AIRBNB_FIGURE_CACHE_MB", "64")) * 2 ** 20,
+                       disk_dir=os.environ.get("AIRBNB_FIGURE_CACHE_DIR"), instrumentation=load_instrumentation(),
+                       max_disk_bytes=int(os.environ.get("AIRBNB_FIGURE_CACHE_DISK_MB", "512")) * 2 ** 20)
+
+
+@st.cache_resource
+def load_query_backend(name):
+    """DuckDB or MongoDB backend shared by every session; the pandas one is rebuilt per dataset version."""
+    if name == "duckdb":
+        return DuckDBBackend(DATASET_PATH)
+    if name == "mongodb":
+        import pymongo
+        client = pymongo.MongoClient(os.environ.get("AIRBNB_MONGODB_URI", "mongodb://localhost:27017/"))
+        return MongoBackend(client["sample_airbnb"]["listingsAndReviews"])
+    raise ValueError(f"unknown query backend {name!r}")
+
+
+@st.cache_data(ttl=30)
+def load_versions(name):
+    backend = load_query_backend(name)
+    return backend.version(), backend.partition_versions()
+
+
+def cached_figure(chart_id, filters, build):
+    # filters start with the selected country, so an incremental update of one country
+    # partition only invalidates that country's figures
+    version = country_versions.get(str(filters[0]), data_version)
+    return figure_cache.get_or_build(chart_id, filters, version, build)
+
+
+def lazy(fetch):
+    """Run a backend query at most once per rerun, and only if a figure built from it is not cached."""
+    result = []
+    def get():
+        if not result:
+            result.append(fetch())
+        return result[0]
+    return get
+
+
+def diagnostic_gauges():
+    return {f"figure_cache_{name}": value for name, value in figure_cache.stats().items()}
+
+
+perf = load_instrumentation()
+rerun = perf.start("rerun")
+setup = perf.start("setup", backend=QUERY_BACKEND)
+figure_cache = load_figure_cache()
+if QUERY_BACKEND == "pandas":
+    data_version = dataset_version(DATASET_PATH)
+    country_versions = partition_versions(DATASET_PATH)
+    df = load_data(DATASET_PATH, data_version)
+    cubes, stale_versions = load_cube_store().get(df, data_version, country_versions)
+    figure_cache.invalidate(stale_versions)
+    backend = PandasBackend(df, cubes, [load_filter_index(data_version, PRICE_LEVELS, df),
+                                        load_filter_index(data_version, LOCATION_LEVELS, df)],
+                            ranking=load_ranking_index(data_version, df))
+else:
+    backend = load_query_backend(QUERY_BACKEND)
+    data_version, country_versions = load_versions(QUERY_BACKEND)
+backend = Instrumented(backend, perf, "query", backend=QUERY_BACKEND)
+perf.stop(setup)
+
+# the Diagnostics page is hidden unless enabled for the deployment or asked for with ?diagnostics=1
+if os.environ.get("AIRBNB_DIAGNOSTICS") == "1" or st.query_params.get("diagnostics") == "1":
+    MENU_OPTIONS = MENU_OPTIONS + ["Diagnostics"]
+
+# ?page=Data%20Exploration (or AIRBNB_DEFAULT_PAGE) opens a page directly, e.g. for headless AppTest runs
+default_page = st.query_params.get("page", os.environ.get("AIRBNB_DEFAULT_PAGE", MENU_OPTIONS[0]))
 
 with st.sidebar:
-    selected_option = option_menu("Main Menu", ["Home", "Data Exploration", "About"])
+    selected_option = option_menu("Main Menu", MENU_OPTIONS,
+                                  default_index=MENU_OPTIONS.index(default_page) if default_page in MENU_OPTIONS else 0)
 
 if selected_option == "Home":
    show_home()
@@ -130,69 +278,72 @@ if selected_option == "Home":
 if selected_option == "Data Exploration":
     tab1, tab2, tab3, tab4, tab5 = st.tabs(["Price Analysis", "Availability Analysis", "Location Based", "Geospatial Visualization", "Top Charts"])
 
-    with tab1:
+    with tab1, perf.span("tab", tab="Price Analysis"):
         st.title("Price Difference")
 
-        country = st.selectbox("Select the Country", df["country"].unique())
-        filtered_df = df[df["country"] == country]
+        country = st.selectbox("Select the Country", backend.options("country"))
 
-        room_type = st.selectbox("Select the Room Type", filtered_df["room_type"].unique())
-        filtered_room_df = filtered_df[filtered_df["room_type"] == room_type]
+        room_type = st.selectbox("Select the Room Type", backend.options("room_type", country=country))
 
-        property_price_df = filtered_room_df.groupby("property_type")[["price", "review_scores", "number_of_reviews"]].sum().reset_index()
+        property_price_df = lazy(lambda: backend.aggregate("property_type", ["price", "review_scores", "number_of_reviews"],
+                                                           country=country, room_type=room_type))
         
-        property_type = st.selectbox("Select the Property Type", filtered_room_df["property_type"].unique())
-        property_filtered_df = filtered_room_df[filtered_room_df["property_type"] == property_type]
+        property_type = st.selectbox("Select the Property Type", backend.options("property_type", country=country, room_type=room_type))
 
-        host_response_time = st.selectbox("Select the Host Response Time", property_filtered_df["host_response_time"].unique())
-        host_response_filtered_df = property_filtered_df[property_filtered_df["host_response_time"] == host_response_time]
+        host_response_time = st.selectbox("Select the Host Response Time", backend.options("host_response_time", country=country, room_type=room_type, property_type=property_type))
 
         col1, col2 = st.columns(2)
 
         with col1:
-            fig_bar = px.bar(property_price_df, x='property_type', y="price", title="Price for Property Types",
-                            hover_data=["number_of_reviews", "review_scores"], color_discrete_sequence=px.colors.sequential.Redor_r, width=600, height=500)
+            fig_bar = cached_figure("price_property_type", (country, room_type), lambda: px.bar(property_price_df(), x='property_type', y="price", title="Price for Property Types",
+                            hover_data=["number_of_reviews", "review_scores"], color_discrete_sequence=px.colors.sequential.Redor_r, width=600, height=500))
             st.plotly_chart(fig_bar)
 
         #property_type = st.selectbox("Select the Property Type", filtered_room_df["property_type"].unique())
         #property_filtered_df = filtered_room_df[filtered_room_df["property_type"] == property_type]
 
         with col2:
-            host_response_df = property_filtered_df.groupby("host_response_time")[["price", "bedrooms"]].sum().reset_index()
-            fig_pie = px.pie(host_response_df, values="price", names="host_response_time",
+            host_response_df = lazy(lambda: backend.aggregate("host_response_time", ["price", "bedrooms"],
+                                                              country=country, room_type=room_type, property_type=property_type))
+            fig_pie = cached_figure("price_host_response_time", (country, room_type, property_type), lambda: px.pie(host_response_df(), values="price", names="host_response_time",
                             hover_data=["bedrooms"], color_discrete_sequence=px.colors.sequential.BuPu_r,
-                            title="Price Difference Based on Host Response Time", width=600, height=500)
+                            title="Price Difference Based on Host Response Time", width=600, height=500))
             st.plotly_chart(fig_pie)
 
         #host_response_time = st.selectbox("Select the Host Response Time", property_filtered_df["host_response_time"].unique())
         #host_response_filtered_df = property_filtered_df[property_filtered_df["host_response_time"] == host_response_time]
 
-        bed_type_nights_df = host_response_filtered_df.groupby("bed_type")[["minimum_nights", "maximum_nights", "price"]].sum().reset_index()
+        bed_type_nights_df = lazy(lambda: backend.aggregate("bed_type", ["minimum_nights", "maximum_nights", "price"],
+                                                            country=country, room_type=room_type, property_type=property_type,
+                                                            host_response_time=host_response_time))
         
         col3, col4 = st.columns(2)
 
         with col3:
-            fig_min_max_nights = px.bar(bed_type_nights_df, x='bed_type', y=['minimum_nights', 'maximum_nights'],
+            fig_min_max_nights = cached_figure("price_nights", (country, room_type, property_type, host_response_time), lambda: px.bar(bed_type_nights_df(), x='bed_type', y=['minimum_nights', 'maximum_nights'],
                                         title='Minimum and Maximum Nights', hover_data=["price"],
-                                        barmode='group', color_discrete_sequence=px.colors.sequential.Rainbow, width=600, height=500)
+                                        barmode='group', color_discrete_sequence=px.colors.sequential.Rainbow, width=600, height=500))
             st.plotly_chart(fig_min_max_nights)
 
-        bed_type_accommodates_df = host_response_filtered_df.groupby("bed_type")[["bedrooms", "beds", "accommodates", "price"]].sum().reset_index()
+        bed_type_accommodates_df = lazy(lambda: backend.aggregate("bed_type", ["bedrooms", "beds", "accommodates", "price"],
+                                                                  country=country, room_type=room_type, property_type=property_type,
+                                                                  host_response_time=host_response_time))
         
         with col4:
-            fig_bedrooms_beds = px.bar(bed_type_accommodates_df, x='bed_type', y=['bedrooms', 'beds', 'accommodates'],
+            fig_bedrooms_beds = cached_figure("price_bedrooms_beds", (country, room_type, property_type, host_response_time), lambda: px.bar(bed_type_accommodates_df(), x='bed_type', y=['bedrooms', 'beds', 'accommodates'],
                                     title='Bedrooms and Beds Accommodates', hover_data=["price"],
-                                    barmode='group', color_discrete_sequence=px.colors.sequential.Rainbow_r, width=600, height=500)
+                                    barmode='group', color_discrete_sequence=px.colors.sequential.Rainbow_r, width=600, height=500))
             st.plotly_chart(fig_bedrooms_beds)
 
-    with tab2:
+    with tab2, perf.span("tab", tab="Availability Analysis"):
         st.title("Availability Analysis")
     
-        country_a = st.selectbox("Select the Country", df["country"].unique(), key="country_a")
-        availability_df = df[df["country"] == country_a]
+        country_a = st.selectbox("Select the Country", backend.options("country"), key="country_a")
         
-        property_type_a = st.selectbox("Select the Property Type", availability_df["property_type"].unique(), key="property_type_a")
-        property_availability_df = availability_df[availability_df["property_type"] == property_type_a]
+        property_type_a = st.selectbox("Select the Property Type", backend.options("property_type", country=country_a), key="property_type_a")
+        property_availability_df = lazy(lambda: backend.aggregate(["room_type", "bed_type", "is_location_exact"],
+                                                                  ["availability_30", "availability_60", "availability_90", "availability_365"],
+                                                                  country=country_a, property_type=property_type_a))
         
         #room_type_a = st.selectbox("Select the Room Type", property_availability_df["room_type"].unique(), key="room_type_a")
         #room_availability_df = property_availability_df[property_availability_df["room_type"] == room_type_a]
@@ -201,149 +352,189 @@ if selected_option == "Data Exploration":
 
         with col1:
             for period in ["availability_30", "availability_60"]:
-                fig_sunburst = px.sunburst(property_availability_df, path=["room_type", "bed_type", "is_location_exact"], values=period,
+                fig_sunburst = cached_figure(f"availability_sunburst_{period}", (country_a, property_type_a), lambda: px.sunburst(property_availability_df(), path=["room_type", "bed_type", "is_location_exact"], values=period,
                 #fig_sunburst = px.sunburst(room_availability_df, path=["room_type", "bed_type", "is_location_exact"], values=period,                           
-                                        width=600, height=500, title=f"{period.replace('_', ' ').title()}", color_discrete_sequence=px.colors.sequential.Peach_r)
+                                        width=600, height=500, title=f"{period.replace('_', ' ').title()}", color_discrete_sequence=px.colors.sequential.Peach_r))
                 st.plotly_chart(fig_sunburst)
         
         with col2:
             for period in ["availability_90", "availability_365"]:
-                fig_sunburst = px.sunburst(property_availability_df, path=["room_type", "bed_type", "is_location_exact"], values=period,
-                                        width=600, height=500, title=f"{period.replace('_', ' ').title()}", color_discrete_sequence=px.colors.sequential.Agsunset)
+                fig_sunburst = cached_figure(f"availability_sunburst_{period}", (country_a, property_type_a), lambda: px.sunburst(property_availability_df(), path=["room_type", "bed_type", "is_location_exact"], values=period,
+                                        width=600, height=500, title=f"{period.replace('_', ' ').title()}", color_discrete_sequence=px.colors.sequential.Agsunset))
                 st.plotly_chart(fig_sunburst)
 
-        room_type_a = st.selectbox("Select the Room Type", property_availability_df["room_type"].unique(), key="room_type_a")
-        room_availability_df = property_availability_df[property_availability_df["room_type"] == room_type_a]
+        room_type_a = st.selectbox("Select the Room Type", backend.options("room_type", country=country_a, property_type=property_type_a), key="room_type_a")
         
-        availability_response_df = room_availability_df.groupby("host_response_time")[["availability_30", "availability_60", "availability_90", "availability_365", "price"]].sum().reset_index()
+        availability_response_df = lazy(lambda: backend.aggregate("host_response_time", ["availability_30", "availability_60", "availability_90", "availability_365", "price"],
+                                                                  country=country_a, property_type=property_type_a, room_type=room_type_a))
         
-        fig_availability_response = px.bar(availability_response_df, x='host_response_time', y=['availability_30', 'availability_60', 'availability_90', "availability_365"],
+        fig_availability_response = cached_figure("availability_host_response_time", (country_a, property_type_a, room_type_a), lambda: px.bar(availability_response_df(), x='host_response_time', y=['availability_30', 'availability_60', 'availability_90', "availability_365"],
                                         title='Availability Based on Host Response Time', hover_data=["price"],
-                                        barmode='group', color_discrete_sequence=px.colors.sequential.Rainbow_r, width=1000)
+                                        barmode='group', color_discrete_sequence=px.colors.sequential.Rainbow_r, width=1000))
         st.plotly_chart(fig_availability_response)
 
-    with tab3:
+    with tab3, perf.span("tab", tab="Location Based"):
 
         st.title("Location Analysis")
 
-        country_l = st.selectbox("Select the Country", df["country"].unique(), key="country_l")
-        location_df = df[df["country"] == country_l]
-        property_type_l = st.selectbox("Select the Property Type", location_df["property_type"].unique(), key="property_type_l")
-        property_location_df = location_df[location_df["property_type"] == property_type_l]
-        room_type_l = st.selectbox("Select the Room Type", property_location_df["room_type"].unique(), key="room_type_l")  
-
-        price_range_options = [
-            f"{property_location_df['price'].min()} to {property_location_df['price'].max() * 0.30:.2f} (30% of the Value)",
-            f"{property_location_df['price'].max() * 0.30:.2f} to {property_location_df['price'].max() * 0.60:.2f} (30% to 60% of the Value)",
-            f"{property_location_df['price'].max() * 0.60:.2f} to {property_location_df['price'].max():.2f} (60% to 100% of the Value)"
+        country_l = st.selectbox("Select the Country", backend.options("country"), key="country_l")
+        property_type_l = st.selectbox("Select the Property Type", backend.options("property_type", country=country_l), key="property_type_l")
+        room_type_l = st.selectbox("Select the Room Type", backend.options("room_type", country=country_l, property_type=property_type_l), key="room_type_l")  
+
+        price_stats = backend.aggregate("property_type", ["price"], agg=["min", "max"],
+                                        country=country_l, property_type=property_type_l).iloc[0]
+        price_range_options = price_bands(price_stats["price_min"], price_stats["price_max"])
+        price_range_labels = [
+            f"{price_stats['price_min']} to {price_stats['price_max'] * 0.30:.2f} (30% of the Value)",
+            f"{price_stats['price_max'] * 0.30:.2f} to {price_stats['price_max'] * 0.60:.2f} (30% to 60% of the Value)",
+            f"{price_stats['price_max'] * 0.60:.2f} to {price_stats['price_max']:.2f} (60% to 100% of the Value)"
         ]
-        selected_price_range = st.radio("Select the Price Range", price_range_options)
+        selected_price_range = st.radio("Select the Price Range", price_range_options,
+                                        format_func=lambda band: price_range_labels[price_range_options.index(band)])
 
         if selected_price_range:
-            price_range_parts = selected_price_range.split(" to ")[0].split("-")
-            if len(price_range_parts) == 1:
-                min_price = max_price = float(price_range_parts[0])
-            else:
-                min_price, max_price = map(float, price_range_parts)
-            filtered_price_df = property_location_df[(property_location_df["price"] >= min_price) & (property_location_df["price"] <= max_price)]
-            st.dataframe(filtered_price_df)
-
-            
-            room_ty_l = st.selectbox("Select the Room_Type_l", filtered_price_df["room_type"].unique())
-            df_val_sel_rt = filtered_price_df[filtered_price_df["room_type"] == room_ty_l]
-
-            fig_2 = px.bar(df_val_sel_rt, x=["street", "host_location", "host_neighbourhood"], y="market", title="MARKET",
-                        hover_data=["name", "host_name", "market"], barmode='group', orientation='h',
-                        color_discrete_sequence=px.colors.sequential.Rainbow_r, width=1000)
+            price_filters = {"country": country_l, "property_type": property_type_l, "price": tuple(selected_price_range)}
+            listing_count_l = backend.count(**price_filters)
+
+            all_columns = backend.columns()
+            table_columns = st.multiselect("Columns", all_columns, default=[c for c in TABLE_COLUMNS if c in all_columns], key="table_columns_l")
+            sort_options = table_columns or ["price"]
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                sort_by_l = st.selectbox("Sort By", sort_options, index=sort_options.index("price") if "price" in sort_options else 0, key="sort_by_l")
+            with col2:
+                ascending_l = st.radio("Order", ["Ascending", "Descending"], horizontal=True, key="order_l") == "Ascending"
+            with col3:
+                page_size_l = st.selectbox("Rows per Page", PAGE_SIZES, index=1, key="page_size_l")
+            with col4:
+                page_count_l = max(1, -(-listing_count_l // page_size_l))
+                page_l = st.number_input("Page", min_value=1, max_value=page_count_l, value=1, key="page_l")
+
+            st.dataframe(backend.rows(table_columns or ["price"], sort_by_l, ascending_l, (page_l - 1) * page_size_l, page_size_l, **price_filters))
+            st.caption(f"Page {page_l} of {page_count_l} ({listing_count_l} listings)")
+
+            room_ty_l = st.selectbox("Select the Room_Type_l", backend.options("room_type", **price_filters))
+            location_filters = (country_l, property_type_l, selected_price_range, room_ty_l)
+
+            fig_2 = cached_figure("location_market", location_filters, lambda: px.bar(
+                        pd.concat([backend.top_values(column, room_type=room_ty_l, **price_filters).rename(columns={column: "location"}).assign(field=column)
+                                   for column in ["street", "host_location", "host_neighbourhood"]]),
+                        x="listings", y="location", color="field", title=f"MARKET (top {LOCATION_TOP_N} locations)",
+                        hover_data=["average_price"], barmode='group', orientation='h',
+                        color_discrete_sequence=px.colors.sequential.Rainbow_r, width=1000))
             st.plotly_chart(fig_2)
 
-            fig_3 = px.bar(df_val_sel_rt, x="government_area", y=["host_is_superhost", "host_neighbourhood", "cancellation_policy"], title="GOVERNMENT_AREA",
-                        hover_data=["guests_included", "location_type"], barmode='group',
-                        color_discrete_sequence=px.colors.sequential.Rainbow_r, width=1000)
+            fig_3 = cached_figure("location_government_area", location_filters, lambda: px.bar(
+                        backend.top_values("government_area", by="cancellation_policy", room_type=room_ty_l, **price_filters),
+                        x="government_area", y="listings", color="cancellation_policy",
+                        title=f"GOVERNMENT_AREA (top {LOCATION_TOP_N} areas)",
+                        hover_data=["average_price"], barmode='stack',
+                        color_discrete_sequence=px.colors.sequential.Rainbow_r, width=1000))
             st.plotly_chart(fig_3)
 
-    with tab4:
+    with tab4, perf.span("tab", tab="Geospatial Visualization"):
         st.title("Geospatial Visualization")
         st.write("") #'  #add space'
 
-        fig_map = px.scatter_mapbox(df, lat="latitude", lon="longitude", color="price", size="accommodates",
-                                    color_continuous_scale="rainbow", hover_name="name", range_color=(0, 49000),
-                                    mapbox_style="carto-positron", zoom=1)
-        fig_map.update_layout(width=1150, height=800, title="Geospatial Distribution of Listings")
+        country_g = st.selectbox("Select the Country", ["All"] + list(backend.options("country")), key="country_g")
+        zoom_g = st.slider("Zoom Level", min_value=1, max_value=12, value=1, key="zoom_g")
+        map_filters = {} if country_g == "All" else {"country": country_g}
+
+        # exact listings are only drawn for the view around a market, never as a sample of the world
+        markets_g = backend.options("market", **map_filters) if zoom_g >= EXACT_ZOOM else []
+        if markets_g:
+            market_g = st.selectbox("Centre on Market", markets_g, key="market_g")
+
+            def view_figure():
+                centre = densest_centre(backend.grid_cells(zoom_g, market=market_g, **map_filters))
+                view_filters = {**map_filters, **view_bounds(centre, zoom_g)}
+                return points_figure(backend.map_points(MAX_POINTS, **view_filters), zoom_g,
+                                     backend.count(**view_filters), centre)
+
+            fig_map = cached_figure("geo_map", (country_g, zoom_g, market_g), view_figure)
+        else:
+            fig_map = cached_figure("geo_map", (country_g, zoom_g), lambda: cells_figure(
+                backend.grid_cells(zoom_g, **map_filters), zoom_g, backend.count(**map_filters)))
         st.plotly_chart(fig_map)
 
-    with tab5:
+    with tab5, perf.span("tab", tab="Top Charts"):
         st.title("Top Charts Analysis")
 
-        country_t = st.selectbox("Select the Country_t", df["country"].unique())
-        df1_t = df[df["country"] == country_t]
-
-        property_ty_t = st.selectbox("Select the Property_type_t", df1_t["property_type"].unique())
-        df2_t = df1_t[df1_t["property_type"] == property_ty_t]
-        df2_t.reset_index(drop=True, inplace=True)
-
-        df2_t_sorted = df2_t.sort_values(by="price")
-        df2_t_sorted.reset_index(drop=True, inplace=True)
+        country_t = st.selectbox("Select the Country_t", backend.options("country"))
 
-        df_price = pd.DataFrame(df2_t_sorted.groupby("host_neighbourhood")["price"].agg(["sum", "mean"]))
-        df_price.reset_index(inplace=True)
-        df_price.columns = ["host_neighbourhood", "Total_price", "Avarage_price"] #renaming 
+        property_ty_t = st.selectbox("Select the Property_type_t", backend.options("property_type", country=country_t))
+        df_price = lazy(lambda: backend.aggregate("host_neighbourhood", ["price"], agg=["sum", "mean"],
+                                                  country=country_t, property_type=property_ty_t)
+                        .set_axis(["host_neighbourhood", "Total_price", "Avarage_price"], axis=1)) #renaming 
 
         col1, col2 = st.columns(2)
 
         with col1:
-            fig_price = px.bar(df_price, x="Total_price", y="host_neighbourhood", orientation='h',
-                            title="PRICE BASED ON HOST_NEIGHBOURHOOD", width=600, height=800)
+            fig_price = cached_figure("top_neighbourhood_total", (country_t, property_ty_t), lambda: px.bar(df_price(), x="Total_price", y="host_neighbourhood", orientation='h',
+                            title="PRICE BASED ON HOST_NEIGHBOURHOOD", width=600, height=800))
             st.plotly_chart(fig_price)
 
         with col2:
-            fig_price_2 = px.bar(df_price, x="Avarage_price", y="host_neighbourhood", orientation='h',
-                                title="AVERAGE PRICE BASED ON HOST_NEIGHBOURHOOD", width=600, height=800)
+            fig_price_2 = cached_figure("top_neighbourhood_average", (country_t, property_ty_t), lambda: px.bar(df_price(), x="Avarage_price", y="host_neighbourhood", orientation='h',
+                                title="AVERAGE PRICE BASED ON HOST_NEIGHBOURHOOD", width=600, height=800))
             st.plotly_chart(fig_price_2)
 
         col1, col2 = st.columns(2)
 
         with col1:
-            df_price_1 = pd.DataFrame(df2_t_sorted.groupby("host_location")["price"].agg(["sum", "mean"]))
-            df_price_1.reset_index(inplace=True)
-            df_price_1.columns = ["host_location", "Total_price", "Avarage_price"]
+            df_price_1 = lazy(lambda: backend.aggregate("host_location", ["price"], agg=["sum", "mean"],
+                                                        country=country_t, property_type=property_ty_t)
+                              .set_axis(["host_location", "Total_price", "Avarage_price"], axis=1))
 
-            fig_price_3 = px.bar(df_price_1, x="Total_price", y="host_location", orientation='h',
+            fig_price_3 = cached_figure("top_location_total", (country_t, property_ty_t), lambda: px.bar(df_price_1(), x="Total_price", y="host_location", orientation='h',
                                 width=600, height=800, color_discrete_sequence=px.colors.sequential.Bluered_r,
-                                title="PRICE BASED ON HOST_LOCATION")
+                                title="PRICE BASED ON HOST_LOCATION"))
             st.plotly_chart(fig_price_3)
 
         with col2:
-            fig_price_4 = px.bar(df_price_1, x="Avarage_price", y="host_location", orientation='h',
+            fig_price_4 = cached_figure("top_location_average", (country_t, property_ty_t), lambda: px.bar(df_price_1(), x="Avarage_price", y="host_location", orientation='h',
                                 width=600, height=800, color_discrete_sequence=px.colors.sequential.Bluered_r,
-                                title="AVERAGE PRICE BASED ON HOST_LOCATION")
+                                title="AVERAGE PRICE BASED ON HOST_LOCATION"))
             st.plotly_chart(fig_price_4)
 
-        room_type_t = st.selectbox("Select the Room_Type_t", df2_t_sorted["room_type"].unique())
+        room_type_t = st.selectbox("Select the Room_Type_t", backend.options("room_type", country=country_t, property_type=property_ty_t))
 
-        df3_t = df2_t_sorted[df2_t_sorted["room_type"] == room_type_t]
-        df3_t_sorted_price = df3_t.sort_values(by="price")
-        df3_t_sorted_price.reset_index(drop=True, inplace=True)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            rank_by_t = st.selectbox("Rank By", RANKING_METRICS, key="rank_by_t")
+        with col2:
+            top_n_t = st.number_input("Top N", min_value=1, max_value=1000, value=TOP_N, key="top_n_t")
+        with col3:
+            ascending_t = st.radio("Order", ["Ascending", "Descending"], horizontal=True, key="order_t") == "Ascending"
 
-        df3_top_50_price = df3_t_sorted_price.head(100)
+        top_filters = (country_t, property_ty_t, room_type_t, rank_by_t, top_n_t, ascending_t)
+        df3_top_50_price = lazy(lambda: backend.top_listings(rank_by_t, top_n_t, ascending_t, country=country_t,
+                                                             property_type=property_ty_t, room_type=room_type_t))
 
-        fig_top_50_price_1 = px.bar(df3_top_50_price, x="name", y="price", color="price",
+        fig_top_50_price_1 = cached_figure("top_listings_nights", top_filters, lambda: px.bar(df3_top_50_price(), x="name", y=rank_by_t, color=rank_by_t,
                                     color_continuous_scale="rainbow",
-                                    range_color=(0, df3_top_50_price["price"].max()),
+                                    range_color=(0, df3_top_50_price()[rank_by_t].max()),
                                     title="MINIMUM_NIGHTS MAXIMUM_NIGHTS AND ACCOMMODATES",
                                     width=1200, height=800,
-                                    hover_data=["minimum_nights", "maximum_nights", "accommodates"])
+                                    hover_data=["price", "minimum_nights", "maximum_nights", "accommodates"]))
 
         st.plotly_chart(fig_top_50_price_1)
 
-        fig_top_50_price_2 = px.bar(df3_top_50_price, x="name", y="price", color="price",
+        fig_top_50_price_2 = cached_figure("top_listings_beds", top_filters, lambda: px.bar(df3_top_50_price(), x="name", y=rank_by_t, color=rank_by_t,
                                     color_continuous_scale="greens",
                                     title="BEDROOMS, BEDS, ACCOMMODATES AND BED_TYPE",
-                                    range_color=(0, df3_top_50_price["price"].max()),
+                                    range_color=(0, df3_top_50_price()[rank_by_t].max()),
                                     width=1200, height=800,
-                                    hover_data=["accommodates", "bedrooms", "beds", "bed_type"])
+                                    hover_data=["price", "accommodates", "bedrooms", "beds", "bed_type"]))
 
         st.plotly_chart(fig_top_50_price_2)
 
 if selected_option == "About":
     show_about()
+
+if selected_option == "Diagnostics":
+    show_diagnostics()
+
+perf.stop(rerun, page=selected_option)
+if os.environ.get("AIRBNB_METRICS_FILE"):
+    perf.export(os.environ["AIRBNB_METRICS_FILE"], diagnostic_gauges())
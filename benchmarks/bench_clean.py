@@ -0,0 +1,136 @@
+"""Rows/sec of the notebook's per-cell cleaning against cleaning.clean_listings.
+
+    python -m benchmarks.bench_clean --rows 10000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from bson.decimal128 import Decimal128
+
+from cleaning import clean_listings
+
+
+def make_raw_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    countries = np.array(["United States", "Spain", "Brazil", "Portugal", "Turkey", "Australia"])
+
+    def decimals(low, high, missing=0.0):
+        values = rng.uniform(low, high, rows).round(2)
+        return [None if m else Decimal128(str(v)) for v, m in zip(values, rng.random(rows) < missing)]
+
+    def maybe(values, missing):
+        values = values.astype(object)
+        values[rng.random(rows) < missing] = None
+        return values
+
+    return pd.DataFrame({
+        "_id": np.arange(rows).astype(str),
+        "minimum_nights": rng.integers(1, 30, rows).astype(str),
+        "maximum_nights": rng.integers(30, 1125, rows).astype(str),
+        "beds": maybe(rng.integers(1, 6, rows).astype(float), 0.01),
+        "bedrooms": maybe(rng.integers(1, 4, rows).astype(float), 0.01),
+        "bathrooms": decimals(1, 3, 0.01),
+        "cleaning_fee": decimals(0, 200, 0.25),
+        "price": decimals(20, 900),
+        "extra_people": decimals(0, 50),
+        "guests_included": decimals(1, 4),
+        "host_response_time": maybe(rng.choice(["within an hour", "within a day"], rows), 0.2),
+        "host_response_rate": maybe(rng.integers(0, 101, rows).astype(float), 0.2),
+        "host_neighbourhood": np.where(rng.random(rows) < 0.3, "", rng.choice(["Centro", "Downtown"], rows)),
+        "host_is_superhost": rng.random(rows) < 0.3,
+        "host_has_profile_pic": rng.random(rows) < 0.9,
+        "host_identity_verified": rng.random(rows) < 0.6,
+        "suburb": np.where(rng.random(rows) < 0.3, "", rng.choice(["North", "South", "East"], rows)),
+        "market": np.where(rng.random(rows) < 0.01, "", rng.choice(["Porto", "Rio", "Sydney"], rows)),
+        "country": rng.choice(countries, rows),
+        "is_location_exact": rng.random(rows) < 0.8,
+    })
+
+
+def convert_decimal128_to_float(value):
+    if isinstance(value, Decimal128):
+        return float(str(value))
+    elif pd.isnull(value):
+        return np.nan
+    else:
+        return value
+
+
+def convert_to_float(value):
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def notebook_clean(df):
+    """The per-cell cleaning path from Air.ipynb."""
+    df = df.copy()
+    df["beds"] = df["beds"].fillna(df["beds"].median())
+    df["bedrooms"] = df["bedrooms"].fillna(df["bedrooms"].median())
+    df["bathrooms"] = df["bathrooms"].apply(convert_decimal128_to_float)
+    df["bathrooms"] = df["bathrooms"].fillna(np.nanmedian(df["bathrooms"]))
+    df["cleaning_fee"] = df["cleaning_fee"].apply(convert_to_float)
+    df["cleaning_fee"] = df["cleaning_fee"].fillna(np.nanmedian(df["cleaning_fee"]))
+    df["minimum_nights"] = df["minimum_nights"].astype(int)
+    df["maximum_nights"] = df["maximum_nights"].astype(int)
+    df["bedrooms"] = df["bedrooms"].astype(int)
+    df["beds"] = df["beds"].astype(int)
+    for column in ["bathrooms", "price", "extra_people", "guests_included", "cleaning_fee"]:
+        df[column] = df[column].astype(str).astype(float).astype(int)
+
+    df["host_neighbourhood"] = df["host_neighbourhood"].replace(r"^\s*$", np.nan, regex=True)
+    df["host_response_time"] = df["host_response_time"].fillna(df["host_response_time"].mode()[0])
+    df["host_response_rate"] = df["host_response_rate"].fillna(df["host_response_rate"].median())
+    df["host_neighbourhood"] = df["host_neighbourhood"].fillna(df["host_neighbourhood"].mode()[0])
+    for column in ["host_is_superhost", "host_has_profile_pic", "host_identity_verified", "is_location_exact"]:
+        df[column] = df[column].map({False: "No", True: "Yes"})
+
+    empty = {"suburb": [], "market": []}
+    for index, row in df.iterrows():
+        for column in empty:
+            if row[column] == "":
+                empty[column].append(index)
+
+    for column in ["suburb", "market"]:
+        df[column] = df[column].replace(r"^\s*$", np.nan, regex=True)
+
+        def fill_with_mode(group, column=column):
+            mode_value = group[column].mode()
+            if not mode_value.empty:
+                group[column] = group[column].fillna(mode_value[0])
+            return group
+
+        df = df.groupby(df["country"].to_numpy(), group_keys=False).apply(fill_with_mode)
+    return df
+
+
+def rows_per_second(func, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - start)
+    return len(df) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'notebook rows/s':>16} {'vectorized rows/s':>18} {'speedup':>8}")
+    for rows in args.rows:
+        df = make_raw_frame(rows)
+        before = rows_per_second(notebook_clean, df, args.repeat)
+        after = rows_per_second(clean_listings, df, args.repeat)
+        print(f"{rows:>10} {before:>16,.0f} {after:>18,.0f} {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
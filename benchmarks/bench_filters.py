@@ -0,0 +1,73 @@
+"""Per-interaction latency of the Price Analysis filter cascade: boolean masks against FilterIndex.
+
+    python -m benchmarks.bench_filters --scales 1 10 100
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.data import SAMPLE_ROWS, make_listings
+from filter_index import FilterIndex
+from storage import to_columnar
+
+LEVELS = ("country", "room_type", "property_type", "host_response_time")
+
+
+def mask_cascade(df, selected):
+    """What each rerun of the original tab did: filter, then .unique() for the next selectbox."""
+    frame = df
+    options = frame[LEVELS[0]].unique()
+    for level, value in zip(LEVELS, selected):
+        frame = frame[frame[level] == value]
+        if level != LEVELS[-1]:
+            options = frame[LEVELS[LEVELS.index(level) + 1]].unique()
+    return frame, options
+
+
+def index_cascade(df, index, selected):
+    options = index.options()
+    for depth in range(1, len(selected) + 1):
+        options = index.options(*selected[:depth])
+    return index.take(df, *selected), options
+
+
+def latency_ms(func, interactions):
+    timings = []
+    for selected in interactions:
+        start = time.perf_counter()
+        func(selected)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--interactions", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'rows':>9} {'build ms':>9} {'mask p50':>9} {'mask p99':>9} {'index p50':>10} {'index p99':>10}")
+    for scale in args.scales:
+        df = to_columnar(make_listings(SAMPLE_ROWS * scale))
+        start = time.perf_counter()
+        index = FilterIndex(df, LEVELS)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        rng = np.random.default_rng(scale)
+        interactions = []
+        for _ in range(args.interactions):
+            selected = []
+            for _ in LEVELS:
+                options = index.options(*selected)
+                selected.append(options[rng.integers(len(options))])
+            interactions.append(tuple(selected))
+
+        mask = latency_ms(lambda selected: mask_cascade(df, selected), interactions)
+        indexed = latency_ms(lambda selected: index_cascade(df, index, selected), interactions)
+        print(f"{scale:>5}x {len(df):>9} {build_ms:>9.1f} {mask[0]:>9.2f} {mask[1]:>9.2f} "
+              f"{indexed[0]:>10.2f} {indexed[1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
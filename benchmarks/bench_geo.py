@@ -0,0 +1,48 @@
+"""Payload size and build time of the full-scatter map against the aggregated/sampled map.
+
+    python -m benchmarks.bench_geo --scales 1 10 100
+"""
+import argparse
+import time
+
+import plotly.express as px
+
+from benchmarks.data import SAMPLE_ROWS, make_listings
+from geo import EXACT_ZOOM, map_figure
+from storage import to_columnar
+
+
+def full_scatter(df):
+    """The original tab 4 figure."""
+    fig = px.scatter_mapbox(df, lat="latitude", lon="longitude", color="price", size="accommodates",
+                            color_continuous_scale="rainbow", hover_name="name", range_color=(0, 49000),
+                            mapbox_style="carto-positron", zoom=1)
+    fig.update_layout(width=1150, height=800, title="Geospatial Distribution of Listings")
+    return fig
+
+
+def measure(build):
+    """Seconds to build and serialize the figure, and the JSON payload size in bytes."""
+    start = time.perf_counter()
+    payload = build().to_json()
+    return time.perf_counter() - start, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--zoom", type=int, nargs="+", default=[1, 4, EXACT_ZOOM])
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'rows':>9} {'mode':>12} {'build s':>8} {'payload KB':>11}")
+    for scale in args.scales:
+        df = to_columnar(make_listings(SAMPLE_ROWS * scale))
+        seconds, size = measure(lambda: full_scatter(df))
+        print(f"{scale:>5}x {len(df):>9} {'full':>12} {seconds:>8.3f} {size / 1024:>11,.0f}")
+        for zoom in args.zoom:
+            seconds, size = measure(lambda: map_figure(df, zoom))
+            print(f"{scale:>5}x {len(df):>9} {f'zoom {zoom}':>12} {seconds:>8.3f} {size / 1024:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
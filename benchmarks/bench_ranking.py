@@ -0,0 +1,69 @@
+"""Top Charts top-N listings: the original double sort against partial selection and the presorted RankingIndex.
+
+    python -m benchmarks.bench_ranking --scales 1 10 100 --k 100
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_filters import latency_ms
+from benchmarks.data import SAMPLE_ROWS, make_listings
+from ranking import RANKING_LEVELS, RankingIndex
+from storage import to_columnar
+from table import select_rows
+
+
+def sorted_path(df, selected, metric, k):
+    """What the original tab did on every rerun: filter, full sort, filter again, full sort, head."""
+    country, property_type, room_type = selected
+    df2_t = df[(df["country"] == country) & (df["property_type"] == property_type)]
+    df2_t.reset_index(drop=True, inplace=True)
+    df2_t_sorted = df2_t.sort_values(by=metric)
+    df2_t_sorted.reset_index(drop=True, inplace=True)
+    df3_t = df2_t_sorted[df2_t_sorted["room_type"] == room_type]
+    df3_t_sorted = df3_t.sort_values(by=metric)
+    df3_t_sorted.reset_index(drop=True, inplace=True)
+    return df3_t_sorted.head(k)
+
+
+def partition_path(df, selected, metric, k):
+    country, property_type, room_type = selected
+    group = df[(df["country"] == country) & (df["property_type"] == property_type) & (df["room_type"] == room_type)]
+    return select_rows(group, metric, True, 0, k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--k", type=int, default=100)
+    parser.add_argument("--metric", default="price")
+    parser.add_argument("--interactions", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'rows':>9} {'build ms':>9} {'sort p50':>9} {'sort p99':>9} "
+          f"{'select p50':>11} {'select p99':>11} {'index p50':>10} {'index p99':>10}")
+    for scale in args.scales:
+        df = to_columnar(make_listings(SAMPLE_ROWS * scale))
+        start = time.perf_counter()
+        index = RankingIndex(df)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        groups = df.groupby(list(RANKING_LEVELS), observed=True).size()
+        rng = np.random.default_rng(scale)
+        # weight groups by size, as users land on the big ones more often
+        interactions = [groups.index[i] for i in rng.choice(len(groups), args.interactions, p=groups / groups.sum())]
+
+        for selected in interactions[:5]:
+            expected = partition_path(df, selected, args.metric, args.k)["_id"].tolist()
+            assert index.take(df, args.metric, args.k, True, *selected)["_id"].tolist() == expected
+
+        full = latency_ms(lambda selected: sorted_path(df, selected, args.metric, args.k), interactions)
+        partial = latency_ms(lambda selected: partition_path(df, selected, args.metric, args.k), interactions)
+        indexed = latency_ms(lambda selected: index.take(df, args.metric, args.k, True, *selected), interactions)
+        print(f"{scale:>5}x {len(df):>9} {build_ms:>9.1f} {full[0]:>9.2f} {full[1]:>9.2f} "
+              f"{partial[0]:>11.2f} {partial[1]:>11.2f} {indexed[0]:>10.2f} {indexed[1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
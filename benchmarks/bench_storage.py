@@ -0,0 +1,62 @@
+"""Cold-load time and resident memory of the CSV export against the Parquet dataset.
+
+    python -m benchmarks.bench_storage --scales 1 10 100
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.data import SAMPLE_ROWS, make_listings
+from storage import APP_COLUMNS, write_dataset
+
+# Each load runs in a fresh interpreter so nothing is warm
+LOADER = """
+import json, sys, time
+import pandas as pd
+from storage import APP_COLUMNS, read_dataset
+
+def rss_mb():
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith("VmRSS")) / 1024
+
+kind, path = sys.argv[1], sys.argv[2]
+before = rss_mb()
+start = time.perf_counter()
+df = pd.read_csv(path) if kind == "csv" else read_dataset(path, columns=APP_COLUMNS)
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "rss_mb": rss_mb() - before,
+                  "frame_mb": df.memory_usage(deep=True).sum() / 2 ** 20}))
+"""
+
+
+def cold_load(kind, path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", LOADER, kind, path], cwd=root, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'rows':>9} {'format':>8} {'load s':>8} {'rss MB':>8} {'frame MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            df = make_listings(SAMPLE_ROWS * scale)[APP_COLUMNS]
+            csv_path = os.path.join(tmp, f"listings_{scale}.csv")
+            parquet_path = os.path.join(tmp, f"listings_{scale}.parquet")
+            df.to_csv(csv_path, index=False)
+            write_dataset(df, parquet_path)
+            for kind, path in (("csv", csv_path), ("parquet", parquet_path)):
+                result = cold_load(kind, path)
+                print(f"{scale:>5}x {len(df):>9} {kind:>8} {result['seconds']:>8.3f} "
+                      f"{result['rss_mb']:>8.1f} {result['frame_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
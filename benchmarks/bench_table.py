@@ -0,0 +1,63 @@
+"""Response size and build time of the Location Based tab: full slice against paged table and top-N charts.
+
+    python -m benchmarks.bench_table --scales 1 10 100
+"""
+import argparse
+import time
+
+import pandas as pd
+import plotly.express as px
+import pyarrow as pa
+
+from benchmarks.data import SAMPLE_ROWS, make_listings
+from storage import to_columnar
+from table import TABLE_COLUMNS, page_rows, top_values
+
+
+def arrow_bytes(df):
+    """Size of the Arrow IPC stream st.dataframe sends for df."""
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+def full_response(rows):
+    """The original tab: every row and column, plus two per-listing bar charts."""
+    charts = rows.astype({"host_is_superhost": str, "cancellation_policy": str})
+    fig_2 = px.bar(charts, x=["street", "host_location", "host_neighbourhood"], y="market", title="MARKET",
+                   hover_data=["name", "host_name", "market"], barmode='group', orientation='h')
+    fig_3 = px.bar(charts, x="government_area", y=["host_is_superhost", "host_neighbourhood", "cancellation_policy"],
+                   title="GOVERNMENT_AREA", hover_data=["guests_included", "location_type"], barmode='group')
+    return arrow_bytes(rows) + len(fig_2.to_json()) + len(fig_3.to_json())
+
+
+def paged_response(rows):
+    page = page_rows(rows, TABLE_COLUMNS, "price", True, 0, 50)
+    locations = pd.concat([top_values(rows, column).rename(columns={column: "location"}).assign(field=column)
+                           for column in ["street", "host_location", "host_neighbourhood"]])
+    fig_2 = px.bar(locations, x="listings", y="location", color="field", barmode='group', orientation='h')
+    fig_3 = px.bar(top_values(rows, "government_area", by="cancellation_policy"), x="government_area",
+                   y="listings", color="cancellation_policy", barmode='stack')
+    return arrow_bytes(page) + len(fig_2.to_json()) + len(fig_3.to_json())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'band rows':>10} {'mode':>6} {'build s':>8} {'response KB':>12}")
+    for scale in args.scales:
+        df = to_columnar(make_listings(SAMPLE_ROWS * scale))
+        rows = df[(df["country"] == "United States") & (df["property_type"] == "Apartment")]
+        rows = rows[rows["price"] <= rows["price"].max() * 0.30]
+        for mode, respond in (("full", full_response), ("paged", paged_response)):
+            start = time.perf_counter()
+            size = respond(rows)
+            print(f"{scale:>5}x {len(rows):>10} {mode:>6} {time.perf_counter() - start:>8.3f} {size / 1024:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Synthetic, already-cleaned listings frames shaped like Airbnbfinal.csv for the benchmarks."""
+import datetime
+
+import numpy as np
+import pandas as pd
+from bson.decimal128 import Decimal128
+
+
+SAMPLE_ROWS = 5555
+
+COUNTRIES = {
+    "United States": ["Oahu", "Maui", "New York"], "Spain": ["Barcelona"], "Brazil": ["Rio De Janeiro"],
+    "Portugal": ["Porto"], "Turkey": ["Istanbul"], "Australia": ["Sydney"], "Canada": ["Montreal"],
+    "Hong Kong": ["Hong Kong"], "China": ["Hong Kong"],
+}
+PROPERTY_TYPES = ["Apartment", "House", "Condominium", "Serviced apartment", "Loft", "Guest suite", "Townhouse",
+                  "Bed and breakfast", "Hostel", "Villa", "Boutique hotel", "Guesthouse", "Hotel", "Other"]
+ROOM_TYPES = ["Entire home/apt", "Private room", "Shared room"]
+BED_TYPES = ["Real Bed", "Pull-out Sofa", "Futon", "Couch", "Airbed"]
+RESPONSE_TIMES = ["within an hour", "within a few hours", "within a day", "a few days or more"]
+CANCELLATION = ["flexible", "moderate", "strict_14_with_grace_period", "super_strict_30", "super_strict_60"]
+CENTRES = {"United States": (21.3, -157.8), "Spain": (41.39, 2.17), "Brazil": (-22.97, -43.18),
+           "Portugal": (41.15, -8.61), "Turkey": (41.01, 28.98), "Australia": (-33.87, 151.21),
+           "Canada": (45.5, -73.57), "Hong Kong": (22.3, 114.17), "China": (22.3, 114.17)}
+
+
+def skewed_choice(rng, options, rows, skew=1.2):
+    weights = 1.0 / np.arange(1, len(options) + 1) ** skew
+    return rng.choice(np.asarray(options, dtype=object), rows, p=weights / weights.sum())
+
+
+def make_listings(rows=SAMPLE_ROWS, seed=0, skew=1.2):
+    rng = np.random.default_rng(seed)
+    country = skewed_choice(rng, list(COUNTRIES), rows, skew)
+    market = np.array([rng.choice(COUNTRIES[c]) for c in country], dtype=object)
+    centre = np.array([CENTRES[c] for c in country])
+    neighbourhoods = np.array([f"Neighbourhood {i}" for i in range(400)], dtype=object)
+    locations = np.array([f"Location {i}" for i in range(300)], dtype=object)
+    areas = np.array([f"Area {i}" for i in range(150)], dtype=object)
+    return pd.DataFrame({
+        "_id": np.arange(rows).astype(str),
+        "name": np.char.add("Listing ", np.arange(rows).astype(str)).astype(object),
+        "country": country,
+        "market": market,
+        "street": np.char.add("Street ", rng.integers(0, 2000, rows).astype(str)).astype(object),
+        "government_area": skewed_choice(rng, areas, rows, 0.8),
+        "location_type": "Point",
+        "latitude": centre[:, 0] + rng.normal(0, 0.1, rows),
+        "longitude": centre[:, 1] + rng.normal(0, 0.1, rows),
+        "is_location_exact": rng.choice(["Yes", "No"], rows, p=[0.8, 0.2]).astype(object),
+        "property_type": skewed_choice(rng, PROPERTY_TYPES, rows, skew),
+        "room_type": skewed_choice(rng, ROOM_TYPES, rows, skew),
+        "bed_type": skewed_choice(rng, BED_TYPES, rows, 2.5),
+        "accommodates": rng.integers(1, 16, rows),
+        "bedrooms": rng.integers(0, 6, rows),
+        "beds": rng.integers(1, 10, rows),
+        "minimum_nights": rng.integers(1, 30, rows),
+        "maximum_nights": rng.integers(30, 1125, rows),
+        "price": np.minimum(rng.lognormal(4.8, 0.8, rows), 48000).astype(int),
+        "guests_included": rng.integers(1, 6, rows),
+        "cancellation_policy": skewed_choice(rng, CANCELLATION, rows, skew),
+        "number_of_reviews": rng.poisson(25, rows),
+        "review_scores": rng.integers(0, 101, rows),
+        "host_name": np.char.add("Host ", rng.integers(0, rows // 2 + 1, rows).astype(str)).astype(object),
+        "host_location": skewed_choice(rng, locations, rows, 0.8),
+        "host_neighbourhood": skewed_choice(rng, neighbourhoods, rows, 0.8),
+        "host_response_time": skewed_choice(rng, RESPONSE_TIMES, rows, skew),
+        "host_is_superhost": rng.choice(["Yes", "No"], rows, p=[0.2, 0.8]).astype(object),
+        "availability_30": rng.integers(0, 31, rows),
+        "availability_60": rng.integers(0, 61, rows),
+        "availability_90": rng.integers(0, 91, rows),
+        "availability_365": rng.integers(0, 366, rows),
+    })
+
+
+def make_documents(rows=SAMPLE_ROWS, seed=0, skew=1.2, blank=0.03):
+    """listingsAndReviews-shaped documents for make_listings(rows, seed, skew)."""
+    return [doc for chunk in iter_documents(rows, seed, skew, blank) for doc in chunk]
+
+
+def iter_documents(rows=SAMPLE_ROWS, seed=0, skew=1.2, blank=0.03, chunk_size=50000):
+    """make_documents in lists of at most chunk_size documents, for scales that do not fit in memory as dicts.
+
+    A share of the fields the cleaning step fills (beds, bedrooms, host_response_time,
+    host_neighbourhood, market) is missing or empty, and money fields are Decimal128.
+    """
+    df = make_listings(rows, seed, skew)
+    rng = np.random.default_rng(seed + 1)
+    blanks = {column: rng.random(rows) < blank
+              for column in ["beds", "bedrooms", "host_response_time", "host_neighbourhood", "market"]}
+    scraped = datetime.datetime(2019, 3, 1)
+    docs = []
+    for i, row in enumerate(df.rename(columns={"_id": "id"}).itertuples(index=False)):
+        doc = {
+            "_id": row.id, "listing_url": f"https://www.airbnb.com/rooms/{row.id}", "name": row.name,
+            "property_type": row.property_type, "room_type": row.room_type, "bed_type": row.bed_type,
+            "minimum_nights": str(row.minimum_nights), "maximum_nights": str(row.maximum_nights),
+            "cancellation_policy": row.cancellation_policy, "last_scraped": scraped + datetime.timedelta(seconds=i),
+            "accommodates": int(row.accommodates), "bedrooms": int(row.bedrooms), "beds": int(row.beds),
+            "number_of_reviews": int(row.number_of_reviews), "bathrooms": Decimal128("1.0"),
+            "price": Decimal128(f"{row.price}.00"), "cleaning_fee": Decimal128("25.00"),
+            "extra_people": Decimal128("0.00"), "guests_included": Decimal128(str(row.guests_included)),
+            "images": {"picture_url": f"https://a0.muscache.com/im/pictures/{row.id}.jpg"},
+            "review_scores": {"review_scores_rating": int(row.review_scores)},
+            "host": {"host_id": row.host_name.split()[-1], "host_name": row.host_name,
+                     "host_location": row.host_location, "host_response_time": row.host_response_time,
+                     "host_neighbourhood": row.host_neighbourhood, "host_response_rate": 100,
+                     "host_is_superhost": row.host_is_superhost == "Yes", "host_has_profile_pic": True,
+                     "host_identity_verified": True, "host_listings_count": 1, "host_total_listings_count": 1,
+                     "host_verifications": ["email", "phone"]},
+            "address": {"street": row.street, "suburb": "", "government_area": row.government_area,
+                        "market": row.market, "country": row.country, "country_code": row.country[:2].upper(),
+                        "location": {"type": "Point", "coordinates": [float(row.longitude), float(row.latitude)],
+                                     "is_location_exact": row.is_location_exact == "Yes"}},
+            "availability": {period: int(getattr(row, period))
+                             for period in ["availability_30", "availability_60", "availability_90", "availability_365"]},
+            "amenities": ["Wifi", "Kitchen"],
+        }
+        for column in ["beds", "bedrooms"]:
+            if blanks[column][i]:
+                del doc[column]
+        if blanks["host_response_time"][i]:
+            doc["host"]["host_response_time"] = None
+        if blanks["host_neighbourhood"][i]:
+            doc["host"]["host_neighbourhood"] = ""
+        if blanks["market"][i]:
+            doc["address"]["market"] = ""
+        docs.append(doc)
+        if len(docs) == chunk_size:
+            yield docs
+            docs = []
+    if docs:
+        yield docs
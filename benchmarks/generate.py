@@ -0,0 +1,56 @@
+"""Generate synthetic listingsAndReviews documents at any scale, into MongoDB and/or a cleaned Parquet dataset.
+
+    python -m benchmarks.generate --scale 100 --output Airbnbfinal.parquet
+    python -m benchmarks.generate --scale 10 --uri mongodb://localhost:27017/ --db bench_airbnb
+"""
+import argparse
+
+import pandas as pd
+import pymongo
+
+from benchmarks.data import SAMPLE_ROWS, iter_documents
+from cleaning import clean_listings
+from extract import flatten_listing, new_buffers, to_frame
+from storage import write_dataset
+
+
+def flatten(docs):
+    buffers = new_buffers()
+    for doc in docs:
+        flatten_listing(doc, buffers)
+    return to_frame(buffers)
+
+
+def build_dataset(path, rows=SAMPLE_ROWS, seed=0, skew=1.2, coll=None):
+    """Run generated documents through the export, cleaning and storage steps; optionally insert them into coll."""
+    frames = []
+    for docs in iter_documents(rows, seed, skew):
+        if coll is not None:
+            coll.insert_many(docs, ordered=False)
+        frames.append(flatten(docs))
+    df = clean_listings(pd.concat(frames, ignore_index=True))
+    if path:
+        write_dataset(df, path)
+    return len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1, help="multiple of the 5555-listing sample")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skew", type=float, default=1.2, help="Zipf exponent of the country/type distributions")
+    parser.add_argument("--output", help="Parquet dataset to write")
+    parser.add_argument("--uri", help="MongoDB to insert the raw documents into")
+    parser.add_argument("--db", default="sample_airbnb")
+    parser.add_argument("--collection", default="listingsAndReviews")
+    args = parser.parse_args()
+    if not args.output and not args.uri:
+        parser.error("give --output and/or --uri")
+
+    coll = pymongo.MongoClient(args.uri)[args.db][args.collection] if args.uri else None
+    total = build_dataset(args.output, int(SAMPLE_ROWS * args.scale), args.seed, args.skew, coll)
+    print(f"Generated {total} listings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Headless load test: concurrent AppTest sessions clicking through random filters on generated data.
+
+    python -m benchmarks.load_test --scales 1 10 100 --sessions 4 --interactions 50
+
+Every scale runs in a fresh interpreter so peak RSS belongs to that scale alone. Each
+rerun is timed end to end and its payload is the serialized charts plus table bytes.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.data import SAMPLE_ROWS
+from benchmarks.generate import build_dataset
+from instrumentation import peak_rss_bytes
+from storage import DATASET_PATH
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE = "Data Exploration"
+
+
+def payload_bytes(at):
+    charts = sum(len(chart.proto.spec) for chart in at.get("plotly_chart"))
+    tables = sum(len(table.proto.arrow_data.data) for table in at.dataframe)
+    return charts + tables
+
+
+def interact(at, rng):
+    """Change one random widget the way a user would: a filter, the map zoom, the table page or the top N."""
+    kind = rng.choice(["selectbox", "zoom", "page", "top_n"], p=[0.7, 0.1, 0.1, 0.1])
+    if kind == "zoom":
+        at.slider(key="zoom_g").set_value(int(rng.integers(1, 13)))
+    elif kind == "page":
+        page = at.number_input(key="page_l")
+        page.set_value(int(rng.integers(page.proto.min, page.proto.max + 1)))
+    elif kind == "top_n":
+        at.number_input(key="top_n_t").set_value(int(rng.choice([10, 50, 100, 500])))
+    else:
+        selectbox = at.selectbox[int(rng.integers(len(at.selectbox)))]
+        if selectbox.options:
+            selectbox.select_index(int(rng.integers(len(selectbox.options))))
+
+
+def run_session(seed, interactions, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng(seed)
+    at = AppTest.from_file(os.path.join(ROOT, "Air.py"), default_timeout=timeout)
+    at.query_params["page"] = PAGE
+    latencies, payloads = [], []
+    for step in range(interactions + 1):
+        if step:
+            interact(at, rng)
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(f"session {seed} step {step}: {at.exception[0].message}")
+        payloads.append(payload_bytes(at))
+    return latencies, payloads
+
+
+def worker(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = build_dataset(os.path.join(tmp, DATASET_PATH), int(SAMPLE_ROWS * args.scale), args.seed, args.skew)
+        shutil.copy(os.path.join(ROOT, "images.jpg"), tmp)
+        os.chdir(tmp)
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+        with ThreadPoolExecutor(args.sessions) as pool:
+            results = list(pool.map(lambda session: run_session(args.seed + session, args.interactions, args.timeout),
+                                    range(args.sessions)))
+    # the first run loads the data and warms the caches, so it is reported on its own
+    first = [latencies[0] for latencies, _ in results]
+    latencies = np.array([seconds for session, _ in results for seconds in session[1:]]) * 1000
+    payloads = np.array([size for _, session in results for size in session[1:]])
+    print(json.dumps({"rows": rows, "first_s": max(first),
+                      "p50_ms": float(np.percentile(latencies, 50)), "p99_ms": float(np.percentile(latencies, 99)),
+                      "peak_rss_mb": peak_rss_bytes() / 2 ** 20,
+                      "payload_p50_kb": float(np.percentile(payloads, 50)) / 1024,
+                      "payload_max_kb": float(payloads.max()) / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent sessions")
+    parser.add_argument("--interactions", type=int, default=50, help="widget changes per session")
+    parser.add_argument("--backend", default="pandas", help="AIRBNB_QUERY_BACKEND for the app")
+    parser.add_argument("--skew", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed for one rerun")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--scale", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    env = dict(os.environ, AIRBNB_QUERY_BACKEND=args.backend)
+    print(f"{'scale':>6} {'rows':>9} {'first s':>8} {'p50 ms':>8} {'p99 ms':>8} {'peak MB':>8} "
+          f"{'payload p50 KB':>15} {'payload max KB':>15}")
+    for scale in args.scales:
+        command = [sys.executable, "-m", "benchmarks.load_test", "--worker", "--scale", str(scale),
+                   "--sessions", str(args.sessions), "--interactions", str(args.interactions),
+                   "--skew", str(args.skew), "--seed", str(args.seed), "--timeout", str(args.timeout)]
+        output = subprocess.run(command, cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{scale:>5g}x {result['rows']:>9} {result['first_s']:>8.2f} {result['p50_ms']:>8.1f} "
+              f"{result['p99_ms']:>8.1f} {result['peak_rss_mb']:>8.0f} {result['payload_p50_kb']:>15.1f} "
+              f"{result['payload_max_kb']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
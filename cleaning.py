@@ -0,0 +1,162 @@
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from bson.decimal128 import Decimal128
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    column: str
+    source: str = "number"   # "decimal", "number", "string" or "bool"
+    dtype: str = None        # target dtype after filling, e.g. "int64"
+    fill: object = None      # "median", "mode", "group_mode" or a constant
+    group_by: str = None     # grouping column for "group_mode"
+
+
+# Mirrors the cleaning steps of Air.ipynb
+CLEANING_SPEC = [
+    ColumnSpec("minimum_nights", dtype="int64", fill=0),
+    ColumnSpec("maximum_nights", dtype="int64", fill=0),
+    ColumnSpec("beds", dtype="int64", fill="median"),
+    ColumnSpec("bedrooms", dtype="int64", fill="median"),
+    ColumnSpec("bathrooms", source="decimal", dtype="int64", fill="median"),
+    ColumnSpec("cleaning_fee", source="decimal", dtype="int64", fill="median"),
+    ColumnSpec("price", source="decimal", dtype="int64", fill=0),
+    ColumnSpec("extra_people", source="decimal", dtype="int64", fill=0),
+    ColumnSpec("guests_included", source="decimal", dtype="int64", fill=0),
+    ColumnSpec("host_response_time", source="string", fill="mode"),
+    ColumnSpec("host_response_rate", fill="median"),
+    ColumnSpec("host_neighbourhood", source="string", fill="mode"),
+    ColumnSpec("host_is_superhost", source="bool"),
+    ColumnSpec("host_has_profile_pic", source="bool"),
+    ColumnSpec("host_identity_verified", source="bool"),
+    ColumnSpec("suburb", source="string", fill="group_mode", group_by="country"),
+    ColumnSpec("market", source="string", fill="group_mode", group_by="country"),
+    ColumnSpec("is_location_exact", source="bool"),
+]
+
+BOOL_LABELS = {False: "No", True: "Yes", "False": "No", "True": "Yes", "No": "No", "Yes": "Yes"}
+
+
+def decimal128_to_float(values):
+    """Decode a sequence of Decimal128 values from their 128-bit BID encoding in bulk."""
+    words = np.frombuffer(b"".join(value.bid for value in values), dtype="<u8").reshape(-1, 2)
+    low, high = words[:, 0], words[:, 1]
+    exponent = ((high >> 49) & 0x3FFF).astype(np.int64) - 6176
+    coefficient = (high & 0x1FFFFFFFFFFFF).astype(np.float64) * 2.0 ** 64 + low.astype(np.float64)
+    with np.errstate(over="ignore", invalid="ignore"):
+        result = np.where(exponent >= 0, coefficient * 10.0 ** np.maximum(exponent, 0),
+                          coefficient / 10.0 ** np.maximum(-exponent, 0))
+    special = (high >> 61) & 3 == 3
+    result[special] = 0.0
+    result[special & ((high >> 58) & 0x1F == 0x1E)] = np.inf
+    result[special & ((high >> 58) & 0x1F == 0x1F)] = np.nan
+    return np.where(high >> 63 == 1, -result, result)
+
+
+def to_numeric(series):
+    """Convert a column that may hold Decimal128 values to float64 without per-cell str() round-trips."""
+    if series.dtype != object:
+        return pd.to_numeric(series, errors="coerce")
+    values = series.to_numpy()
+    is_decimal = np.fromiter((isinstance(value, Decimal128) for value in values), dtype=bool, count=len(values))
+    if not is_decimal.any():
+        return pd.to_numeric(series, errors="coerce")
+    result = np.full(len(values), np.nan)
+    result[is_decimal] = decimal128_to_float(values[is_decimal])
+    if not is_decimal.all():
+        result[~is_decimal] = pd.to_numeric(pd.Series(values[~is_decimal], dtype=object), errors="coerce")
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+def blank_to_nan(series):
+    blank = series.astype("string").str.strip().eq("").fillna(False).astype(bool)
+    return series.mask(blank)
+
+
+def group_modes(df, column, group_by):
+    """Mode of column per group, ties broken by the smallest value as Series.mode() does."""
+    counts = df.groupby([group_by, column]).size().reset_index(name="count")
+    counts = counts.sort_values(["count", column], ascending=[False, True])
+    return counts.drop_duplicates(group_by).set_index(group_by)[column]
+
+
+def convert(series, spec):
+    if spec.source in ("decimal", "number"):
+        return to_numeric(series)
+    if spec.source == "string":
+        return blank_to_nan(series)
+    if spec.source == "bool":
+        return series.map(BOOL_LABELS)
+    return series
+
+
+def fit_fill_values(df, spec=CLEANING_SPEC):
+    """Compute the fill value for every column with a data-dependent fill strategy."""
+    fill_values = {}
+    for column_spec in spec:
+        if column_spec.column not in df:
+            continue
+        values = convert(df[column_spec.column], column_spec)
+        if column_spec.fill == "median":
+            fill_values[column_spec.column] = np.nanmedian(values)
+        elif column_spec.fill == "mode":
+            modes = values.mode()
+            fill_values[column_spec.column] = modes.iloc[0] if not modes.empty else np.nan
+        elif column_spec.fill == "group_mode":
+            frame = pd.DataFrame({column_spec.column: values, column_spec.group_by: df[column_spec.group_by]})
+            fill_values[column_spec.column] = group_modes(frame, column_spec.column, column_spec.group_by)
+    return fill_values
+
+
+def clean_listings(df, spec=CLEANING_SPEC, fill_values=None):
+    """Apply the cleaning spec to a flattened listings frame using column-wise operations only."""
+    if fill_values is None:
+        fill_values = fit_fill_values(df, spec)
+    df = df.copy()
+    for column_spec in spec:
+        column = column_spec.column
+        if column not in df:
+            continue
+        values = convert(df[column], column_spec)
+        if column_spec.fill == "group_mode":
+            values = values.fillna(df[column_spec.group_by].map(fill_values[column]))
+        elif column in fill_values:
+            values = values.fillna(fill_values[column])
+        elif column_spec.fill is not None:
+            values = values.fillna(column_spec.fill)
+        if column_spec.dtype is not None:
+            values = values.astype(column_spec.dtype)
+        df[column] = values
+    return df
+
+
+def clean_csv(source, target, spec=CLEANING_SPEC, chunksize=50000):
+    """Clean a raw export chunk by chunk; fill values are fitted on a first pass over the needed columns."""
+    needed = {column_spec.column for column_spec in spec if column_spec.fill in ("median", "mode", "group_mode")}
+    needed |= {column_spec.group_by for column_spec in spec if column_spec.group_by}
+    fill_values = fit_fill_values(pd.read_csv(source, usecols=sorted(needed)), spec)
+
+    total = 0
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        chunk = clean_listings(chunk, spec, fill_values)
+        chunk.to_csv(target, mode="w" if total == 0 else "a", header=total == 0, index=False)
+        total += len(chunk)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean a raw listings export")
+    parser.add_argument("source")
+    parser.add_argument("--output", default="Airbnbfinal.csv")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    total = clean_csv(args.source, args.output, chunksize=args.chunk_size)
+    print(f"Cleaned {total} listings into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
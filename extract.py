@@ -0,0 +1,126 @@
+import argparse
+
+import pandas as pd
+import pymongo
+
+from cleaning import CLEANING_SPEC, to_numeric
+
+
+LISTING_FIELDS = ["_id", "listing_url", "name", "property_type", "room_type", "bed_type", "minimum_nights",
+                  "maximum_nights", "cancellation_policy", "accommodates", "bedrooms", "beds", "number_of_reviews",
+                  "bathrooms", "price", "extra_people", "guests_included", "images", "review_scores", "cleaning_fee"]
+
+HOST_FIELDS = ["host_id", "host_url", "host_name", "host_location", "host_response_time", "host_thumbnail_url",
+               "host_picture_url", "host_neighbourhood", "host_response_rate", "host_is_superhost",
+               "host_has_profile_pic", "host_identity_verified", "host_listings_count", "host_total_listings_count",
+               "host_verifications"]
+
+ADDRESS_FIELDS = ["street", "suburb", "government_area", "market", "country", "country_code"]
+
+LOCATION_FIELDS = ["location_type", "longitude", "latitude", "is_location_exact"]
+
+AVAILABILITY_FIELDS = ["availability_30", "availability_60", "availability_90", "availability_365"]
+
+COLUMNS = LISTING_FIELDS + HOST_FIELDS + ADDRESS_FIELDS + LOCATION_FIELDS + AVAILABILITY_FIELDS + ["amenities"]
+
+# One projection covering everything the four separate notebook scans used to fetch
+PROJECTION = {field: 1 for field in LISTING_FIELDS if field not in ("images", "review_scores")}
+PROJECTION.update({"images.picture_url": 1, "review_scores.review_scores_rating": 1, "host": 1,
+                   "address": 1, "availability": 1, "amenities": 1})
+
+DECIMAL_COLUMNS = [spec.column for spec in CLEANING_SPEC if spec.source == "decimal"]
+
+
+def new_buffers():
+    return {column: [] for column in COLUMNS}
+
+
+def to_frame(buffers):
+    """Build a chunk DataFrame, converting Decimal128 columns to float64 in bulk."""
+    frame = pd.DataFrame(buffers, columns=COLUMNS)
+    for column in DECIMAL_COLUMNS:
+        frame[column] = to_numeric(frame[column])
+    return frame
+
+
+def flatten_listing(doc, buffers):
+    """Append one listingsAndReviews document to the column buffers."""
+    for field in LISTING_FIELDS:
+        if field == "images":
+            buffers[field].append((doc.get("images") or {}).get("picture_url"))
+        elif field == "review_scores":
+            buffers[field].append((doc.get("review_scores") or {}).get("review_scores_rating", 0))
+        else:
+            buffers[field].append(doc.get(field))
+
+    host = doc.get("host") or {}
+    for field in HOST_FIELDS:
+        buffers[field].append(host.get(field))
+
+    address = doc.get("address") or {}
+    for field in ADDRESS_FIELDS:
+        buffers[field].append(address.get(field))
+
+    location = address.get("location") or {}
+    coordinates = location.get("coordinates") or [None, None]
+    buffers["location_type"].append(location.get("type"))
+    buffers["longitude"].append(coordinates[0])
+    buffers["latitude"].append(coordinates[1])
+    buffers["is_location_exact"].append(location.get("is_location_exact"))
+
+    availability = doc.get("availability") or {}
+    for field in AVAILABILITY_FIELDS:
+        buffers[field].append(availability.get(field))
+
+    buffers["amenities"].append(sorted(doc.get("amenities") or []))
+
+
+def iter_listing_chunks(coll, batch_size=1000, chunk_size=50000, query=None):
+    """Stream the collection once and yield flattened DataFrames of at most chunk_size rows."""
+    cursor = coll.find(query or {}, PROJECTION, batch_size=batch_size)
+    buffers = new_buffers()
+    rows = 0
+    for doc in cursor:
+        flatten_listing(doc, buffers)
+        rows += 1
+        if rows == chunk_size:
+            yield to_frame(buffers)
+            buffers = new_buffers()
+            rows = 0
+    if rows:
+        yield to_frame(buffers)
+
+
+def export_listings(coll, filepath, batch_size=1000, chunk_size=50000):
+    """Write the flattened collection to a CSV one chunk at a time and return the row count."""
+    total = 0
+    for chunk in iter_listing_chunks(coll, batch_size=batch_size, chunk_size=chunk_size):
+        chunk.to_csv(filepath, mode="w" if total == 0 else "a", header=total == 0, index=False)
+        total += len(chunk)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export sample_airbnb.listingsAndReviews in a single pass")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default="sample_airbnb")
+    parser.add_argument("--collection", default="listingsAndReviews")
+    parser.add_argument("--output", default="AirbnbRaw.csv")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--state", help="where to record the point ingest.py syncs from (default: its state file)")
+    args = parser.parse_args()
+
+    # ingest imports this module, so import it here
+    from ingest import STATE_PATH, initial_state, save_state
+
+    client = pymongo.MongoClient(args.uri)
+    coll = client[args.db][args.collection]
+    state = initial_state(coll)
+    total = export_listings(coll, args.output, batch_size=args.batch_size, chunk_size=args.chunk_size)
+    save_state(state, args.state or STATE_PATH)
+    print(f"Wrote {total} listings to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
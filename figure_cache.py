@@ -0,0 +1,171 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+
+import numpy as np
+import plotly.io as pio
+
+
+def normalize_filters(filters):
+    """Turn widget values into a hashable, order-stable key component."""
+    if isinstance(filters, dict):
+        return tuple(sorted((str(name), normalize_filters(value)) for name, value in filters.items()))
+    if isinstance(filters, (list, tuple)):
+        return tuple(normalize_filters(value) for value in filters)
+    if isinstance(filters, np.generic):
+        return filters.item()
+    if filters is None or isinstance(filters, (bool, int, float, str)):
+        return filters
+    return str(filters)
+
+
+def version_tag(version):
+    return hashlib.sha1(repr(version).encode()).hexdigest()[:12]
+
+
+class FigureCache:
+    """Size-bounded LRU of built Plotly figures shared by every session of the app.
+
+    Entries are keyed on (chart id, normalized filters, dataset version) and sized by their
+    JSON payload. A hit returns the stored Figure itself, so callers must not modify it.
+    When disk_dir is set, every entry is also written there as JSON and survives memory
+    eviction and restarts; the disk tier is an LRU of its own, bounded by max_disk_bytes.
+    """
+
+    def __init__(self, max_bytes=64 * 2 ** 20, disk_dir=None, instrumentation=None, max_disk_bytes=512 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.instrumentation = instrumentation
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._files = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            # pick up what earlier processes left, oldest use first
+            files = sorted((entry.stat().st_mtime, entry.name, entry.stat().st_size)
+                           for entry in os.scandir(disk_dir) if entry.name.endswith(".json"))
+            for _, name, size in files:
+                self._files[name] = size
+                self._disk_bytes += size
+            self._trim_disk()
+
+    @staticmethod
+    def key(chart_id, filters, version):
+        return chart_id, normalize_filters(filters), version
+
+    @staticmethod
+    def _file_name(key):
+        # the version tag prefix lets invalidate() find a version's files without reading them
+        return f"{version_tag(key[2])}-{hashlib.sha1(repr(key).encode()).hexdigest()}.json"
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        if self.disk_dir:
+            name = self._file_name(key)
+            path = os.path.join(self.disk_dir, name)
+            try:
+                with open(path, encoding="utf-8") as handle:
+                    payload = handle.read()
+                os.utime(path)
+            except FileNotFoundError:
+                payload = None
+            if payload is not None:
+                entry = pio.from_json(payload, skip_invalid=True), len(payload)
+                with self._lock:
+                    self.disk_hits += 1
+                    # another process sharing disk_dir may have written it
+                    self._disk_bytes += len(payload) - self._files.pop(name, 0)
+                    self._files[name] = len(payload)
+                self._store(key, entry)
+                return entry
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, figure, payload):
+        if self.disk_dir and len(payload) <= self.max_disk_bytes:
+            name = self._file_name(key)
+            path = os.path.join(self.disk_dir, name)
+            # sessions are threads of one process, so each write needs its own temporary file
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.disk_dir)
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                handle.write(payload)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._disk_bytes += len(payload) - self._files.pop(name, 0)
+                self._files[name] = len(payload)
+                self._trim_disk()
+        self._store(key, (figure, len(payload)))
+
+    def _store(self, key, entry):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if entry[1] > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry[1]
+            while self._bytes > self.max_bytes:
+                _, (_, size) = self._entries.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+
+    def _remove_file(self, name):
+        self._disk_bytes -= self._files.pop(name)
+        try:
+            os.remove(os.path.join(self.disk_dir, name))
+        except FileNotFoundError:
+            pass
+
+    def _trim_disk(self):
+        """Delete the least recently used files until the disk tier fits max_disk_bytes; call with the lock held."""
+        while self._disk_bytes > self.max_disk_bytes:
+            self._remove_file(next(iter(self._files)))
+            self.disk_evictions += 1
+
+    def get_or_build(self, chart_id, filters, version, build):
+        """Return the cached figure for this chart and filter state, building it on a miss."""
+        key = self.key(chart_id, filters, version)
+        entry = self.get(key)
+        if entry is None:
+            timer = self.instrumentation.span("figure_build", chart=chart_id) if self.instrumentation is not None else nullcontext()
+            with timer:
+                figure = build()
+                payload = pio.to_json(figure, validate=False)
+            self.put(key, figure, payload)
+            entry = figure, len(payload)
+        if self.instrumentation is not None:
+            self.instrumentation.observe("figure_payload", entry[1], chart=chart_id)
+        return entry[0]
+
+    def invalidate(self, versions):
+        """Drop the entries, in memory and on disk, built from any of the given dataset or partition versions."""
+        tags = {version_tag(version) for version in versions}
+        with self._lock:
+            for key in [key for key in self._entries if key[2] in versions]:
+                self._bytes -= self._entries.pop(key)[1]
+            for name in [name for name in self._files if name.split("-", 1)[0] in tags]:
+                self._remove_file(name)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                    "evictions": self.evictions, "disk_files": len(self._files), "disk_bytes": self._disk_bytes,
+                    "max_disk_bytes": self.max_disk_bytes, "disk_evictions": self.disk_evictions}
@@ -0,0 +1,33 @@
+import numpy as np
+
+
+class FilterIndex:
+    """Row positions and sorted option lists for a cascade of selectbox filters.
+
+    Built once per dataset version; each level maps a prefix of selected values to the
+    positions of the matching rows, so widget changes never re-scan the frame.
+    """
+
+    def __init__(self, df, levels):
+        self.levels = tuple(levels)
+        self._positions = {(): np.arange(len(df))}
+        self._options = {}
+        for depth in range(1, len(self.levels) + 1):
+            groups = df.groupby(list(self.levels[:depth]), observed=True).indices
+            for key, positions in groups.items():
+                key = key if isinstance(key, tuple) else (key,)
+                self._positions[key] = positions
+                self._options.setdefault(key[:-1], []).append(key[-1])
+        for prefix, options in self._options.items():
+            options.sort()
+
+    def options(self, *selected):
+        """Sorted values of the next level under the selected prefix."""
+        return self._options.get(tuple(selected), [])
+
+    def positions(self, *selected):
+        """Row positions matching the selected prefix."""
+        return self._positions.get(tuple(selected), np.array([], dtype=np.intp))
+
+    def take(self, df, *selected):
+        return df.take(self.positions(*selected))
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+
+CELLS_PER_TILE = 8     # grid cells across one web-mercator tile width
+EXACT_ZOOM = 9         # from this zoom level on, individual listings are drawn
+MAX_POINTS = 5000      # cap on exact points sent to the browser
+TILE_PIXELS = 256      # width of one web-mercator tile on screen
+MAP_WIDTH, MAP_HEIGHT = 1150, 800
+
+POINT_COLUMNS = ["_id", "name", "latitude", "longitude", "price", "accommodates"]
+
+
+def cell_size(zoom):
+    """Width in degrees of a grid cell at the given map zoom level."""
+    return 360.0 / (2 ** zoom) / CELLS_PER_TILE
+
+
+def grid_cells(df, zoom):
+    """Bin listings into a lat/lon grid and return one row per non-empty cell."""
+    size = cell_size(zoom)
+    cells = pd.DataFrame({
+        "cell_x": np.floor((df["longitude"].to_numpy() + 180.0) / size).astype(np.int64),
+        "cell_y": np.floor((df["latitude"].to_numpy() + 90.0) / size).astype(np.int64),
+        "latitude": df["latitude"].to_numpy(),
+        "longitude": df["longitude"].to_numpy(),
+        "price": df["price"].to_numpy(),
+    })
+    cells = cells.groupby(["cell_x", "cell_y"]).agg(latitude=("latitude", "mean"), longitude=("longitude", "mean"),
+                                                      listings=("price", "size"), price=("price", "mean"))
+    return cells.reset_index(drop=True)
+
+
+def view_bounds(centre, zoom):
+    """Latitude and longitude ranges of the map view around centre, as (low, high) range filters."""
+    width = 360.0 / (2 ** zoom) * MAP_WIDTH / TILE_PIXELS
+    height = width * MAP_HEIGHT / MAP_WIDTH * np.cos(np.radians(centre["lat"]))
+    return {"latitude": (max(-90.0, centre["lat"] - height / 2), min(90.0, centre["lat"] + height / 2)),
+            "longitude": (centre["lon"] - width / 2, centre["lon"] + width / 2)}
+
+
+def densest_centre(cells):
+    """Centre of the grid cell holding the most listings, or None without cells."""
+    if not len(cells):
+        return None
+    cell = cells.loc[cells["listings"].idxmax()]
+    return {"lat": float(cell["latitude"]), "lon": float(cell["longitude"])}
+
+
+def point_step(total, max_points=MAX_POINTS):
+    """Stride through the listings in _id order that keeps at most max_points of them."""
+    return max(1, -(-total // max_points))
+
+
+def sample_points(df, max_points=MAX_POINTS):
+    """Every point_step-th listing in _id order, so every query backend picks the same points."""
+    points = df.sort_values("_id", kind="stable") if "_id" in df else df
+    return points.iloc[::point_step(len(points), max_points)]
+
+
+def points_figure(points, zoom, total, centre):
+    """Exact listings in the view around centre, as drawn when zoomed in."""
+    fig = px.scatter_mapbox(points, lat="latitude", lon="longitude", color="price", size="accommodates",
+                            color_continuous_scale="rainbow", hover_name="name", range_color=(0, 49000),
+                            mapbox_style="carto-positron", zoom=zoom, center=centre)
+    fig.update_layout(width=MAP_WIDTH, height=MAP_HEIGHT,
+                      title=f"Geospatial Distribution of Listings ({len(points)} of {total} in view shown)")
+    return fig
+
+
+def cells_figure(cells, zoom, total):
+    """One marker per grid cell, sized by listing count and coloured by average price."""
+    centre = None
+    if len(cells):
+        weights = cells["listings"] / cells["listings"].sum()
+        centre = {"lat": float((cells["latitude"] * weights).sum()), "lon": float((cells["longitude"] * weights).sum())}
+    fig = px.scatter_mapbox(cells, lat="latitude", lon="longitude", color="price", size="listings",
+                            color_continuous_scale="rainbow", hover_data={"listings": True, "price": ":.2f"},
+                            mapbox_style="carto-positron", zoom=zoom, center=centre,
+                            labels={"price": "average price"})
+    fig.update_layout(width=MAP_WIDTH, height=MAP_HEIGHT,
+                      title=f"Geospatial Distribution of Listings ({total} listings in {len(cells)} cells)")
+    return fig
+
+
+def map_figure(df, zoom, max_points=MAX_POINTS, centre=None):
+    """Aggregated cells below EXACT_ZOOM; above it, the listings in view around centre (default: the densest cell)."""
+    if zoom >= EXACT_ZOOM:
+        centre = centre or densest_centre(grid_cells(df, zoom)) or {"lat": 0.0, "lon": 0.0}
+        bounds = view_bounds(centre, zoom)
+        view = df[df["latitude"].between(*bounds["latitude"]) & df["longitude"].between(*bounds["longitude"])]
+        return points_figure(sample_points(view, max_points), zoom, len(view), centre)
+    return cells_figure(grid_cells(df, zoom), zoom, len(df))
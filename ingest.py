@@ -0,0 +1,188 @@
+import argparse
+import os
+
+import pandas as pd
+import pymongo
+from bson import json_util
+from pymongo.errors import OperationFailure
+
+from cleaning import clean_listings, fit_fill_values
+from extract import PROJECTION, flatten_listing, new_buffers, to_frame
+from storage import DATASET_PATH, read_dataset, write_partitions
+
+
+STATE_PATH = "Airbnbfinal.ingest.json"
+
+# ChangeStreamHistoryLost and ChangeStreamFatalError: the stored resume token can no longer be used
+RESUME_TOKEN_ERRORS = (286, 280)
+
+FILL_COLUMNS = ["beds", "bedrooms", "bathrooms", "cleaning_fee", "host_response_time", "host_response_rate",
+                "host_neighbourhood", "suburb", "market", "country"]
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as handle:
+        return json_util.loads(handle.read())
+
+
+def save_state(state, path=STATE_PATH):
+    with open(f"{path}.tmp", "w", encoding="utf-8") as handle:
+        handle.write(json_util.dumps(state))
+    os.replace(f"{path}.tmp", path)
+
+
+def apply_changes(docs, deleted_ids=(), path=DATASET_PATH):
+    """Upsert changed listing documents and drop deleted ones; return the countries rewritten."""
+    buffers = new_buffers()
+    for doc in docs:
+        flatten_listing(doc, buffers)
+    ids = pd.Series(buffers["_id"] + list(deleted_ids), dtype=object).astype(str)
+    if ids.empty:
+        return set()
+
+    existing = read_dataset(path, columns=FILL_COLUMNS + ["_id"])
+    changed = to_frame(buffers)
+    if len(changed):
+        changed = clean_listings(changed, fill_values=fit_fill_values(existing))
+    countries = set(changed["country"].dropna().astype(str))
+    countries |= set(existing.loc[existing["_id"].astype(str).isin(ids), "country"].astype(str))
+    if not countries:
+        return set()
+
+    current = read_dataset(path, filters=[("country", "in", sorted(countries))])
+    current = current[~current["_id"].astype(str).isin(ids)]
+    merged = pd.concat([current.astype({"country": str}), changed.astype({"country": str})], ignore_index=True)
+    write_partitions(merged, path, countries)
+    return countries
+
+
+def apply_change_events(events, path=DATASET_PATH):
+    """Apply change-stream events (insert, update, replace, delete); the last event per _id wins."""
+    latest = {}
+    for event in events:
+        latest[event["documentKey"]["_id"]] = event
+    docs = [event["fullDocument"] for event in latest.values()
+            if event["operationType"] != "delete" and event.get("fullDocument") is not None]
+    deleted = [key for key, event in latest.items()
+               if event["operationType"] == "delete" or event.get("fullDocument") is None]
+    return apply_changes(docs, deleted, path)
+
+
+def changed_since(coll, state, batch_size=1000):
+    """Cursor over listings scraped after the high-water mark, in (last_scraped, _id) order."""
+    query = {}
+    if state.get("last_scraped") is not None:
+        query = {"$or": [{"last_scraped": {"$gt": state["last_scraped"]}},
+                         {"last_scraped": state["last_scraped"], "_id": {"$gt": state["last_id"]}}]}
+    cursor = coll.find(query, {**PROJECTION, "last_scraped": 1}, batch_size=batch_size)
+    return cursor.sort([("last_scraped", 1), ("_id", 1)])
+
+
+def supports_change_streams(coll):
+    """Change streams need a driver with watch() (mongomock has none) and a replica set or sharded cluster."""
+    if not callable(getattr(type(coll), "watch", None)):
+        return False
+    hello = coll.database.client.admin.command("isMaster")
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+def sync_from_stream(coll, state, path=DATASET_PATH, max_events=100000):
+    """Drain the change stream from the stored resume token."""
+    events = []
+    with coll.watch(full_document="updateLookup", resume_after=state["resume_token"]) as stream:
+        while len(events) < max_events:
+            event = stream.try_next()
+            if event is None:
+                break
+            events.append(event)
+        state["resume_token"] = stream.resume_token
+    return apply_change_events(events, path)
+
+
+def start_token(coll):
+    """Resume token for "now", or None when the server has no change streams (standalone, mongomock)."""
+    if not supports_change_streams(coll):
+        return None
+    with coll.watch() as stream:
+        stream.try_next()
+        return stream.resume_token
+
+
+def high_water_mark(coll):
+    """(last_scraped, _id) of the most recently scraped listing, as stored in the state."""
+    doc = coll.find_one({}, {"last_scraped": 1}, sort=[("last_scraped", -1), ("_id", -1)])
+    return {} if doc is None else {"last_scraped": doc.get("last_scraped"), "last_id": doc["_id"]}
+
+
+def initial_state(coll):
+    """State for a dataset exported from the collection as it is now; take it before the export starts
+    so that changes made while exporting are picked up again by the first sync."""
+    token = start_token(coll)
+    state = high_water_mark(coll)
+    if token is not None:
+        state["resume_token"] = token
+    return state
+
+
+def sync(coll, path=DATASET_PATH, state_path=STATE_PATH, batch_size=1000, chunk_size=50000):
+    """Bring the dataset up to date with the collection and return the countries that changed.
+
+    Uses the change stream when a resume token is stored, otherwise polls by the
+    (last_scraped, _id) high-water mark, upserting chunk_size listings at a time.
+    extract.py records the state when it exports; for a dataset built without it, the
+    first sync only records the collection's current state rather than re-upserting
+    every listing.
+    """
+    state = load_state(state_path)
+    if not state and os.path.exists(path):
+        save_state(initial_state(coll), state_path)
+        return set()
+    if state.get("resume_token") and supports_change_streams(coll):
+        try:
+            countries = sync_from_stream(coll, state, path)
+            save_state(state, state_path)
+            return countries
+        except OperationFailure as error:
+            if error.code not in RESUME_TOKEN_ERRORS:
+                raise
+    # polling cannot see deletes, so only fall back to it when the stream is unusable
+    state.pop("resume_token", None)
+
+    token = start_token(coll)
+    countries = set()
+    docs = []
+    for doc in changed_since(coll, state, batch_size):
+        docs.append(doc)
+        if len(docs) == chunk_size:
+            countries |= apply_changes(docs, path=path)
+            state["last_scraped"], state["last_id"] = doc.get("last_scraped"), doc["_id"]
+            save_state(state, state_path)
+            docs = []
+    if docs:
+        countries |= apply_changes(docs, path=path)
+        state["last_scraped"], state["last_id"] = docs[-1].get("last_scraped"), docs[-1]["_id"]
+    if token is not None:
+        state["resume_token"] = token
+    save_state(state, state_path)
+    return countries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upsert listings changed since the last run into the dataset")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default="sample_airbnb")
+    parser.add_argument("--collection", default="listingsAndReviews")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--state", default=STATE_PATH)
+    args = parser.parse_args()
+
+    client = pymongo.MongoClient(args.uri)
+    coll = client[args.db][args.collection]
+    countries = sync(coll, args.dataset, args.state)
+    print(f"Updated partitions: {', '.join(sorted(countries)) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+logger = logging.getLogger("airbnb.perf")
+
+
+def rss_bytes():
+    """Resident set size of this process, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm", "rb") as handle:
+            return int(handle.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+
+def peak_rss_bytes():
+    try:
+        with open("/proc/self/status", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def label_text(labels):
+    return ", ".join(f"{name}={value}" for name, value in labels)
+
+
+def prometheus_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Instrumentation:
+    """Process-wide timing, memory and size counters for the app.
+
+    A span costs two clock reads and, with track_memory, two reads of /proc/self/statm;
+    results are folded into per-(name, labels) histograms, so it can stay on in production.
+    Finished spans are also kept in a short ring buffer and logged to the "airbnb.perf"
+    logger as JSON when it is enabled for INFO.
+    """
+
+    def __init__(self, track_memory=True, recent=500):
+        self.track_memory = track_memory
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._sizes = {}
+        self._recent = deque(maxlen=recent)
+        self._exported = 0.0
+
+    def start(self, name, **labels):
+        """Open a span by hand, for code that cannot be wrapped in a with block."""
+        return name, labels, time.perf_counter(), rss_bytes() if self.track_memory else None
+
+    def stop(self, token, **labels):
+        name, start_labels, start, rss = token
+        seconds = time.perf_counter() - start
+        rss_delta = None
+        if rss is not None:
+            now = rss_bytes()
+            rss_delta = now - rss if now is not None else None
+        self.record(name, seconds, rss_delta, **start_labels, **labels)
+        return seconds
+
+    @contextmanager
+    def span(self, name, **labels):
+        token = self.start(name, **labels)
+        try:
+            yield
+        finally:
+            self.stop(token)
+
+    def record(self, name, seconds, rss_delta=None, **labels):
+        key = name, tuple(sorted(labels.items()))
+        with self._lock:
+            stats = self._spans.get(key)
+            if stats is None:
+                stats = self._spans[key] = {"count": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                            "buckets": [0] * len(BUCKETS), "max_rss_delta": None}
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["buckets"][next(i for i, bound in enumerate(BUCKETS) if seconds <= bound)] += 1
+            if rss_delta is not None and (stats["max_rss_delta"] is None or rss_delta > stats["max_rss_delta"]):
+                stats["max_rss_delta"] = rss_delta
+            event = {"time": time.time(), "span": name, **labels, "ms": round(seconds * 1000, 3), "rss_delta": rss_delta}
+            self._recent.append(event)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(event, default=str))
+
+    def observe(self, name, size, **labels):
+        """Count a size in bytes, e.g. a serialized figure payload."""
+        key = name, tuple(sorted(labels.items()))
+        with self._lock:
+            stats = self._sizes.setdefault(key, {"count": 0, "bytes": 0, "max_bytes": 0})
+            stats["count"] += 1
+            stats["bytes"] += size
+            stats["max_bytes"] = max(stats["max_bytes"], size)
+
+    @staticmethod
+    def _quantile(stats, q):
+        """q-quantile interpolated within its histogram bucket, as Prometheus' histogram_quantile does."""
+        target, seen, lower = q * stats["count"], 0, 0.0
+        for bound, count in zip(BUCKETS, stats["buckets"]):
+            if count and seen + count >= target:
+                upper = min(bound, stats["max_seconds"])
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+            lower = bound
+        return stats["max_seconds"]
+
+    def summary(self):
+        """One row per span name and labels, slowest total first."""
+        with self._lock:
+            spans = [(key, dict(stats, buckets=list(stats["buckets"]))) for key, stats in self._spans.items()]
+        rows = [{"span": name, "labels": label_text(labels), "count": stats["count"],
+                 "mean_ms": stats["seconds"] / stats["count"] * 1000,
+                 "p50_ms": self._quantile(stats, 0.5) * 1000, "p99_ms": self._quantile(stats, 0.99) * 1000,
+                 "max_ms": stats["max_seconds"] * 1000, "total_s": stats["seconds"],
+                 "max_rss_delta_mb": None if stats["max_rss_delta"] is None else stats["max_rss_delta"] / 2 ** 20}
+                for (name, labels), stats in spans]
+        return sorted(rows, key=lambda row: row["total_s"], reverse=True)
+
+    def sizes(self):
+        with self._lock:
+            return sorted(({"name": name, "labels": label_text(labels), "count": stats["count"],
+                            "mean_kb": stats["bytes"] / stats["count"] / 1024, "max_kb": stats["max_bytes"] / 1024,
+                            "total_mb": stats["bytes"] / 2 ** 20}
+                           for (name, labels), stats in self._sizes.items()),
+                          key=lambda row: row["total_mb"], reverse=True)
+
+    def recent(self):
+        with self._lock:
+            return list(self._recent)
+
+    def prometheus(self, gauges=None):
+        """All counters in the Prometheus text exposition format; gauges adds extra name -> value pairs."""
+        with self._lock:
+            spans = [(key, dict(stats, buckets=list(stats["buckets"]))) for key, stats in self._spans.items()]
+            sizes = [(key, dict(stats)) for key, stats in self._sizes.items()]
+        lines = ["# TYPE airbnb_span_seconds histogram"]
+        for (name, labels), stats in spans:
+            cumulative = 0
+            for bound, count in zip(BUCKETS, stats["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"airbnb_span_seconds_bucket{prometheus_labels([('span', name), *labels, ('le', le)])} "
+                             f"{cumulative}")
+            lines.append(f"airbnb_span_seconds_sum{prometheus_labels([('span', name), *labels])} {stats['seconds']!r}")
+            lines.append(f"airbnb_span_seconds_count{prometheus_labels([('span', name), *labels])} {stats['count']}")
+        lines.append("# TYPE airbnb_span_rss_delta_bytes_max gauge")
+        lines += [f"airbnb_span_rss_delta_bytes_max{prometheus_labels([('span', name), *labels])} {stats['max_rss_delta']}"
+                  for (name, labels), stats in spans if stats["max_rss_delta"] is not None]
+        lines.append("# TYPE airbnb_size_bytes summary")
+        for (name, labels), stats in sizes:
+            lines.append(f"airbnb_size_bytes_sum{prometheus_labels([('name', name), *labels])} {stats['bytes']}")
+            lines.append(f"airbnb_size_bytes_count{prometheus_labels([('name', name), *labels])} {stats['count']}")
+        process = {"process_rss_bytes": rss_bytes(), "process_peak_rss_bytes": peak_rss_bytes(),
+                   "process_uptime_seconds": time.time() - self.started}
+        for name, value in {**process, **(gauges or {})}.items():
+            if value is not None:
+                lines += [f"# TYPE airbnb_{name} gauge", f"airbnb_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path, gauges=None, min_interval=15.0):
+        """Write prometheus() to path (e.g. for node_exporter's textfile collector) at most every min_interval s."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._exported < min_interval:
+                return False
+            self._exported = now
+        with open(f"{path}.{os.getpid()}.tmp", "w", encoding="utf-8") as handle:
+            handle.write(self.prometheus(gauges))
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+        return True
+
+
+class Instrumented:
+    """Proxy that records every public method call of the wrapped object as a span."""
+
+    def __init__(self, target, instrumentation, name, **labels):
+        self._target = target
+        self._instrumentation = instrumentation
+        self._name = name
+        self._labels = labels
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if attr.startswith("_") or not callable(value):
+            return value
+
+        def timed(*args, **kwargs):
+            with self._instrumentation.span(self._name, method=attr, **self._labels):
+                return value(*args, **kwargs)
+        return timed
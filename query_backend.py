@@ -0,0 +1,485 @@
+import hashlib
+import itertools
+import os
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from cleaning import CLEANING_SPEC, to_numeric
+from extract import ADDRESS_FIELDS, AVAILABILITY_FIELDS, HOST_FIELDS
+from geo import MAX_POINTS, POINT_COLUMNS, cell_size, grid_cells, point_step, sample_points
+from ranking import RANKING_COLUMNS, TOP_N
+from rollup import RollupCube
+from storage import APP_COLUMNS, CSV_PATH, DATASET_PATH, dataset_version, partition_versions
+from table import LOCATION_TOP_N, select_rows, top_values
+
+
+BACKENDS = ("pandas", "duckdb", "mongodb")
+
+
+def plain_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def plain_frame(df):
+    """Categoricals as object columns, so results compare equal whichever backend produced them."""
+    return df.astype({column: object for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)})
+
+
+class QueryBackend:
+    """Filters, aggregations and row selections behind the Air.py charts.
+
+    Filters are keyword arguments: a scalar selects rows equal to it, a (low, high) tuple
+    selects the inclusive range. Results are small frames, shaped the same by every backend.
+    """
+
+    path = DATASET_PATH
+
+    def columns(self):
+        return list(APP_COLUMNS)
+
+    def options(self, column, **filters):
+        """Sorted distinct non-null values of column among the filtered listings."""
+        raise NotImplementedError
+
+    def count(self, **filters):
+        raise NotImplementedError
+
+    def aggregate(self, by, measures, agg="sum", **filters):
+        """Measures aggregated per value of by, with the naming rules of RollupCube.query."""
+        dimensions = [by] if isinstance(by, str) else list(by)
+        cells = self.cells(dimensions, measures, **filters)
+        return plain_frame(RollupCube.from_cells(cells, dimensions, measures).query(by, measures, agg))
+
+    def cells(self, dimensions, measures, **filters):
+        """Cube cells ("<measure>_sum", "_count", "_min", "_max") per combination of the dimensions."""
+        raise NotImplementedError
+
+    def rows(self, columns, sort_by=None, ascending=True, offset=0, limit=None, **filters):
+        """Listings in (sort_by, _id) order with nulls last, projected to columns."""
+        raise NotImplementedError
+
+    def top_listings(self, metric, k=TOP_N, ascending=False, columns=RANKING_COLUMNS, **filters):
+        """The k first listings by metric; ORDER BY ... LIMIT and $sort + $limit both run as top-k sorts."""
+        return self.rows(columns, metric, ascending, 0, k, **filters)
+
+    def top_values(self, column, n=LOCATION_TOP_N, by=None, **filters):
+        """Listing count and average price for the n most common values of column (see table.top_values)."""
+        raise NotImplementedError
+
+    def grid_cells(self, zoom, **filters):
+        """Map grid cells at this zoom level (see geo.grid_cells)."""
+        raise NotImplementedError
+
+    def map_points(self, max_points=MAX_POINTS, **filters):
+        """At most max_points listings for the exact map (see geo.sample_points)."""
+        raise NotImplementedError
+
+    def version(self):
+        return dataset_version(self.path)
+
+    def partition_versions(self):
+        return partition_versions(self.path)
+
+
+class PandasBackend(QueryBackend):
+    """The in-process path: a loaded frame, its FilterIndexes, rollup cubes and RankingIndex."""
+
+    def __init__(self, df, cubes=None, indexes=(), path=DATASET_PATH, ranking=None):
+        self.df = df
+        self.cubes = cubes or {}
+        self.indexes = list(indexes)
+        self.path = path
+        self.ranking = ranking
+
+    def _index_prefix(self, filters):
+        """The index covering the longest leading run of equality filters, and that run."""
+        best, best_prefix = None, ()
+        for index in self.indexes:
+            prefix = []
+            for level in index.levels:
+                if level not in filters or isinstance(filters[level], tuple):
+                    break
+                prefix.append(filters[level])
+            if best is None or len(prefix) > len(best_prefix):
+                best, best_prefix = index, tuple(prefix)
+        return best, best_prefix
+
+    def _frame(self, filters):
+        index, prefix = self._index_prefix(filters)
+        df = index.take(self.df, *prefix) if prefix else self.df
+        for column, value in filters.items():
+            if index is not None and column in index.levels[:len(prefix)]:
+                continue
+            if isinstance(value, tuple):
+                df = df[df[column].between(*value)]
+            else:
+                df = df[df[column] == value]
+        return df
+
+    def columns(self):
+        return list(self.df.columns)
+
+    def options(self, column, **filters):
+        index, prefix = self._index_prefix(filters)
+        if (index is not None and len(prefix) == len(filters) < len(index.levels)
+                and index.levels[len(prefix)] == column):
+            return list(index.options(*prefix))
+        return sorted(self._frame(filters)[column].dropna().astype(object).unique())
+
+    def count(self, **filters):
+        return len(self._frame(filters))
+
+    def aggregate(self, by, measures, agg="sum", **filters):
+        dimensions = {by} if isinstance(by, str) else set(by)
+        if not any(isinstance(value, tuple) for value in filters.values()):
+            for cube in self.cubes.values():
+                if dimensions | set(filters) <= set(cube.dimensions) and set(measures) <= set(cube.measures):
+                    return plain_frame(cube.query(by, measures, agg, **filters))
+        return super().aggregate(by, measures, agg, **filters)
+
+    def cells(self, dimensions, measures, **filters):
+        return RollupCube(self._frame(filters), dimensions, measures).cells
+
+    def rows(self, columns, sort_by=None, ascending=True, offset=0, limit=None, **filters):
+        rows = select_rows(self._frame(filters), sort_by, ascending, offset, limit)
+        return plain_frame(rows[list(columns)].reset_index(drop=True))
+
+    def top_listings(self, metric, k=TOP_N, ascending=False, columns=RANKING_COLUMNS, **filters):
+        ranking = self.ranking
+        if (ranking is not None and metric in ranking.metrics and set(filters) == set(ranking.levels)
+                and not any(isinstance(value, tuple) for value in filters.values())):
+            rows = ranking.take(self.df, metric, k, ascending, *(filters[level] for level in ranking.levels))
+            return plain_frame(rows[list(columns)].reset_index(drop=True))
+        # no presorted group: np.partition in select_rows still avoids a full sort
+        return super().top_listings(metric, k, ascending, columns, **filters)
+
+    def top_values(self, column, n=LOCATION_TOP_N, by=None, **filters):
+        return plain_frame(top_values(self._frame(filters), column, n, by))
+
+    def grid_cells(self, zoom, **filters):
+        return grid_cells(self._frame(filters), zoom)
+
+    def map_points(self, max_points=MAX_POINTS, **filters):
+        points = sample_points(self._frame(filters)[POINT_COLUMNS], max_points)
+        return plain_frame(points.reset_index(drop=True))
+
+
+class DuckDBBackend(QueryBackend):
+    """SQL over the Parquet dataset (or the CSV export) in an embedded DuckDB; only results are held."""
+
+    def __init__(self, path=DATASET_PATH, csv_path=CSV_PATH):
+        self.path = path if os.path.exists(path) else csv_path
+        if os.path.isdir(path):
+            source = (f"read_parquet('{os.path.join(path, '**', '*.parquet')}', hive_partitioning = true, "
+                      f"hive_types = {{'country': VARCHAR}}, union_by_name = true)")
+        else:
+            source = f"read_csv_auto('{self.path}')"
+        self._connection = duckdb.connect()
+        select = ", ".join(f'"{column}"' for column in APP_COLUMNS)
+        self._connection.execute(f"CREATE VIEW listings AS SELECT {select} FROM {source}")
+        self._types = dict(self._connection.execute("SELECT column_name, column_type FROM "
+                                                    "(DESCRIBE listings)").fetchall())
+
+    def _query(self, sql, params=()):
+        # one cursor per query: the connection is shared by every session thread
+        return self._connection.cursor().execute(sql, [plain_value(value) for value in params]).df()
+
+    def _name(self, column):
+        if column not in self._types:
+            raise KeyError(f"unknown column {column!r}")
+        return f'"{column}"'
+
+    def _where(self, filters, not_null=()):
+        clauses, params = [], []
+        for column, value in filters.items():
+            if isinstance(value, tuple):
+                clauses.append(f"{self._name(column)} BETWEEN ? AND ?")
+                params.extend(value)
+            else:
+                clauses.append(f"{self._name(column)} = ?")
+                params.append(value)
+        clauses += [f"{self._name(column)} IS NOT NULL" for column in not_null]
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def options(self, column, **filters):
+        where, params = self._where(filters, [column])
+        result = self._query(f"SELECT DISTINCT {self._name(column)} AS value FROM listings{where} ORDER BY 1", params)
+        return result["value"].tolist()
+
+    def count(self, **filters):
+        where, params = self._where(filters)
+        return int(self._query(f"SELECT COUNT(*) AS n FROM listings{where}", params)["n"].iloc[0])
+
+    def cells(self, dimensions, measures, **filters):
+        keys = ", ".join(self._name(column) for column in dimensions)
+        parts = []
+        for measure in measures:
+            name = self._name(measure)
+            total = "BIGINT" if "INT" in self._types[measure] else "DOUBLE"
+            parts += [f"CAST(COALESCE(SUM({name}), 0) AS {total}) AS \"{measure}_sum\"",
+                      f"COUNT({name}) AS \"{measure}_count\"",
+                      f"MIN({name}) AS \"{measure}_min\"", f"MAX({name}) AS \"{measure}_max\""]
+        where, params = self._where(filters, dimensions)
+        return self._query(f"SELECT {keys}, {', '.join(parts)} FROM listings{where} GROUP BY {keys} ORDER BY {keys}",
+                           params)
+
+    def rows(self, columns, sort_by=None, ascending=True, offset=0, limit=None, **filters):
+        where, params = self._where(filters)
+        sql = f"SELECT {', '.join(self._name(column) for column in columns)} FROM listings{where}"
+        if sort_by is not None:
+            sql += f" ORDER BY {self._name(sort_by)} {'ASC' if ascending else 'DESC'} NULLS LAST, \"_id\""
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self._query(sql + f" OFFSET {int(offset)}", params)
+
+    def top_values(self, column, n=LOCATION_TOP_N, by=None, **filters):
+        name = self._name(column)
+        keys = name if by is None else f"{name}, {self._name(by)}"
+        where, params = self._where(filters)
+        top_where, top_params = self._where(filters, [column])
+        result = self._query(
+            f"WITH filtered AS (SELECT * FROM listings{where}), "
+            f"top AS (SELECT {name} FROM listings{top_where} GROUP BY {name} ORDER BY COUNT(*) DESC, {name} LIMIT {int(n)}) "
+            f"SELECT {keys}, COUNT(*) AS listings, AVG(\"price\") AS average_price FROM filtered "
+            f"WHERE {name} IN (SELECT {name} FROM top){'' if by is None else f' AND {self._name(by)} IS NOT NULL'} "
+            f"GROUP BY {keys} ORDER BY {keys}", params + top_params)
+        return result.astype({column: str})
+
+    def grid_cells(self, zoom, **filters):
+        size = float(cell_size(zoom))
+        where, params = self._where(filters)
+        return self._query(
+            f"SELECT AVG(latitude) AS latitude, AVG(longitude) AS longitude, COUNT(*) AS listings, AVG(price) AS price "
+            f"FROM (SELECT *, FLOOR((longitude + 180.0) / {size!r}) AS cell_x, FLOOR((latitude + 90.0) / {size!r}) AS cell_y "
+            f"FROM listings{where}) GROUP BY cell_x, cell_y ORDER BY cell_x, cell_y", params)
+
+    def map_points(self, max_points=MAX_POINTS, **filters):
+        step = point_step(self.count(**filters), max_points)
+        where, params = self._where(filters)
+        columns = ", ".join(self._name(column) for column in POINT_COLUMNS)
+        return self._query(
+            f"SELECT {columns} FROM (SELECT {columns}, ROW_NUMBER() OVER (ORDER BY \"_id\") - 1 AS position "
+            f"FROM listings{where}) WHERE position % {step} = 0 ORDER BY \"_id\"", params)
+
+
+def weighted_median(values, counts):
+    """Median of values repeated counts times, as np.nanmedian of the expanded values (NaNs dropped)."""
+    keep = ~np.isnan(values)
+    values, counts = values[keep], counts[keep]
+    if not len(values):
+        return None
+    order = np.argsort(values)
+    values, cumulative = values[order], np.cumsum(counts[order])
+    total = cumulative[-1]
+    lower = values[np.searchsorted(cumulative, (total - 1) // 2, side="right")]
+    upper = values[np.searchsorted(cumulative, total // 2, side="right")]
+    return float((lower + upper) / 2)
+
+
+def raw_path(column):
+    """Dotted path of a cleaned column in a listingsAndReviews document."""
+    if column in HOST_FIELDS:
+        return f"host.{column}"
+    if column in ADDRESS_FIELDS:
+        return f"address.{column}"
+    if column == "location_type":
+        return "address.location.type"
+    if column == "is_location_exact":
+        return "address.location.is_location_exact"
+    if column in AVAILABILITY_FIELDS:
+        return f"availability.{column}"
+    return column
+
+
+class MongoBackend(QueryBackend):
+    """Aggregation pipelines against listingsAndReviews that reproduce the cleaning rules on the fly.
+
+    Fill values (medians, modes) are fitted once from the collection, as cleaning.fit_fill_values
+    does for the export. Filters on untouched fields are matched on the raw documents first.
+    """
+
+    def __init__(self, coll, window_functions=None):
+        self.coll = coll
+        if window_functions is None:
+            # $setWindowFields arrived in MongoDB 5.0
+            window_functions = tuple(coll.database.client.server_info()["versionArray"][:2]) >= (5, 0)
+        self.window_functions = window_functions
+        specs = {spec.column: spec for spec in CLEANING_SPEC}
+        self.specs = {column: specs[column] for column in APP_COLUMNS if column in specs}
+        self.fill_values = self.fit_fill_values()
+        self.fields = {column: self._expression(column) for column in APP_COLUMNS}
+
+    def _raw(self, column):
+        path = f"${raw_path(column)}"
+        spec = self.specs.get(column)
+        if spec is not None and spec.source == "string":
+            # the export's blanks are empty strings; mongomock and older servers lack $trim
+            return {"$cond": [{"$eq": [path, ""]}, None, path]}
+        return path
+
+    def fit_fill_values(self):
+        fill_values = {}
+        for column, spec in self.specs.items():
+            value = self._raw(column)
+            if spec.fill == "median":
+                # count distinct raw values on the server ($median needs MongoDB 7) and take the median here,
+                # after the same Decimal128/string conversion as the export
+                counts = list(self.coll.aggregate([
+                    {"$project": {"v": value}}, {"$match": {"v": {"$ne": None}}},
+                    {"$group": {"_id": "$v", "n": {"$sum": 1}}}]))
+                numbers = to_numeric(pd.Series([doc["_id"] for doc in counts], dtype=object))
+                fill_values[column] = weighted_median(numbers.to_numpy(dtype=np.float64),
+                                                      np.array([doc["n"] for doc in counts], dtype=np.int64))
+            elif spec.fill == "mode":
+                modes = list(self.coll.aggregate([
+                    {"$project": {"v": value}}, {"$match": {"v": {"$ne": None}}},
+                    {"$group": {"_id": "$v", "n": {"$sum": 1}}}, {"$sort": {"n": -1, "_id": 1}}, {"$limit": 1}]))
+                fill_values[column] = modes[0]["_id"] if modes else None
+            elif spec.fill == "group_mode":
+                counts = self.coll.aggregate([
+                    {"$project": {"g": f"${raw_path(spec.group_by)}", "v": value}},
+                    {"$match": {"v": {"$ne": None}, "g": {"$ne": None}}},
+                    {"$group": {"_id": {"g": "$g", "v": "$v"}, "n": {"$sum": 1}}},
+                    {"$sort": {"_id.g": 1, "n": -1, "_id.v": 1}}])
+                modes = {}
+                for doc in counts:
+                    modes.setdefault(doc["_id"]["g"], doc["_id"]["v"])
+                fill_values[column] = modes
+        return fill_values
+
+    def _expression(self, column):
+        if column == "review_scores":
+            return {"$ifNull": ["$review_scores.review_scores_rating", 0]}
+        if column in ("longitude", "latitude"):
+            return {"$arrayElemAt": ["$address.location.coordinates", 0 if column == "longitude" else 1]}
+        spec = self.specs.get(column)
+        if spec is None:
+            return f"${raw_path(column)}"
+        path = f"${raw_path(column)}"
+        if spec.source == "bool":
+            return {"$cond": [{"$eq": [path, True]}, "Yes", {"$cond": [{"$eq": [path, False]}, "No", None]}]}
+        value = self._raw(column)
+        fill = self.fill_values.get(column, spec.fill)
+        if spec.fill == "group_mode":
+            group = f"${raw_path(spec.group_by)}"
+            fill = {"$switch": {"branches": [{"case": {"$eq": [group, key]}, "then": mode} for key, mode in fill.items()],
+                                "default": None}}
+        if fill is not None:
+            value = {"$ifNull": [value, fill]}
+        if spec.dtype == "int64":
+            value = {"$toLong": value}
+        return value
+
+    def _field(self, column):
+        if column not in self.fields:
+            raise KeyError(f"unknown column {column!r}")
+        return self.fields[column]
+
+    def _pipeline(self, columns, filters, not_null=()):
+        """$match on raw fields, $project the cleaned columns, then $match on the computed ones."""
+        before, after = {}, {}
+        for column, value in filters.items():
+            if isinstance(value, tuple):
+                condition = {"$gte": plain_value(value[0]), "$lte": plain_value(value[1])}
+            else:
+                condition = plain_value(value)
+            expression = self._field(column)
+            if isinstance(expression, str):
+                before[expression[1:]] = condition
+            else:
+                after[column] = condition
+        for column in not_null:
+            after.setdefault(column, {"$ne": None})
+            if isinstance(after[column], dict):
+                after[column] = {**after[column], "$ne": None}
+        stages = [{"$match": before}] if before else []
+        needed = sorted(set(columns) | set(after))
+        if needed:
+            # an empty $project is an error on the server
+            stages.append({"$project": {column: self._field(column) for column in needed}})
+        if after:
+            stages.append({"$match": after})
+        return stages
+
+    def _frame(self, pipeline, columns):
+        return pd.DataFrame(list(self.coll.aggregate(pipeline, allowDiskUse=True)), columns=list(columns))
+
+    def options(self, column, **filters):
+        pipeline = self._pipeline([column], filters, [column])
+        pipeline += [{"$group": {"_id": f"${column}"}}, {"$sort": {"_id": 1}}]
+        return [doc["_id"] for doc in self.coll.aggregate(pipeline)]
+
+    def count(self, **filters):
+        result = list(self.coll.aggregate(self._pipeline([], filters) + [{"$count": "n"}]))
+        return result[0]["n"] if result else 0
+
+    def cells(self, dimensions, measures, **filters):
+        group = {"_id": {column: f"${column}" for column in dimensions}}
+        for measure in measures:
+            value = f"${measure}"
+            group.update({f"{measure}_sum": {"$sum": value},
+                          f"{measure}_count": {"$sum": {"$cond": [{"$gt": [value, None]}, 1, 0]}},
+                          f"{measure}_min": {"$min": value}, f"{measure}_max": {"$max": value}})
+        pipeline = self._pipeline(list(dimensions) + list(measures), filters, dimensions)
+        pipeline += [{"$group": group}]
+        docs = [{**doc.pop("_id"), **doc} for doc in self.coll.aggregate(pipeline)]
+        columns = list(dimensions) + [name for name in group if name != "_id"]
+        return pd.DataFrame(docs, columns=columns).sort_values(list(dimensions), ignore_index=True)
+
+    def rows(self, columns, sort_by=None, ascending=True, offset=0, limit=None, **filters):
+        pipeline = self._pipeline(set(columns) | {"_id"} | ({sort_by} if sort_by else set()), filters)
+        if sort_by is not None:
+            pipeline += [{"$addFields": {"_missing": {"$cond": [{"$gt": [f"${sort_by}", None]}, 0, 1]}}},
+                         {"$sort": {"_missing": 1, sort_by: 1 if ascending else -1, "_id": 1}}]
+        pipeline += [{"$skip": int(offset)}] + ([{"$limit": int(limit)}] if limit is not None else [])
+        return self._frame(pipeline, columns)
+
+    def top_values(self, column, n=LOCATION_TOP_N, by=None, **filters):
+        pipeline = self._pipeline([column], filters, [column])
+        pipeline += [{"$group": {"_id": f"${column}", "n": {"$sum": 1}}}, {"$sort": {"n": -1, "_id": 1}},
+                     {"$limit": int(n)}]
+        top = [doc["_id"] for doc in self.coll.aggregate(pipeline)]
+        keys = [column] if by is None else [column, by]
+        pipeline = self._pipeline(keys + ["price"], filters, keys)
+        pipeline += [{"$match": {column: {"$in": top}}},
+                     {"$group": {"_id": {key: f"${key}" for key in keys}, "listings": {"$sum": 1},
+                                 "average_price": {"$avg": "$price"}}}]
+        docs = [{**doc.pop("_id"), **doc} for doc in self.coll.aggregate(pipeline)]
+        result = pd.DataFrame(docs, columns=keys + ["listings", "average_price"])
+        return result.sort_values(keys, ignore_index=True).astype({column: str})
+
+    def grid_cells(self, zoom, **filters):
+        size = float(cell_size(zoom))
+        pipeline = self._pipeline(["latitude", "longitude", "price"], filters)
+        pipeline += [{"$group": {"_id": {"x": {"$floor": {"$divide": [{"$add": ["$longitude", 180.0]}, size]}},
+                                         "y": {"$floor": {"$divide": [{"$add": ["$latitude", 90.0]}, size]}}},
+                                 "latitude": {"$avg": "$latitude"}, "longitude": {"$avg": "$longitude"},
+                                 "listings": {"$sum": 1}, "price": {"$avg": "$price"}}},
+                     {"$sort": {"_id.x": 1, "_id.y": 1}}]
+        return self._frame(pipeline, ["latitude", "longitude", "listings", "price"])
+
+    def map_points(self, max_points=MAX_POINTS, **filters):
+        step = point_step(self.count(**filters), max_points)
+        pipeline = self._pipeline(POINT_COLUMNS, filters)
+        if step > 1 and self.window_functions:
+            # every step-th listing in _id order, picked on the server as DuckDB does with ROW_NUMBER()
+            pipeline += [{"$setWindowFields": {"sortBy": {"_id": 1}, "output": {"_position": {"$documentNumber": {}}}}},
+                         {"$match": {"$expr": {"$eq": [{"$mod": [{"$subtract": ["$_position", 1]}, step]}, 0]}}},
+                         {"$sort": {"_id": 1}}]
+            return self._frame(pipeline, POINT_COLUMNS)
+        pipeline += [{"$sort": {"_id": 1}}]
+        # without window functions, stream the sorted points and keep every step-th; only the sample is held
+        docs = self.coll.aggregate(pipeline, allowDiskUse=True, batchSize=10000)
+        return pd.DataFrame(itertools.islice(docs, 0, None, step), columns=POINT_COLUMNS)
+
+    def partition_versions(self):
+        """Listing count and latest last_scraped per country, hashed into a token."""
+        counts = self.coll.aggregate([{"$group": {"_id": "$address.country", "n": {"$sum": 1},
+                                                  "last": {"$max": "$last_scraped"}}}])
+        return {doc["_id"]: hashlib.sha1(repr((doc["n"], doc["last"])).encode()).hexdigest()[:12]
+                for doc in counts if doc["_id"] is not None}
+
+    def version(self):
+        return hashlib.sha1(repr(sorted(self.partition_versions().items())).encode()).hexdigest()[:12]
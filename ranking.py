@@ -0,0 +1,49 @@
+import numpy as np
+
+
+RANKING_LEVELS = ("country", "property_type", "room_type")
+RANKING_METRICS = ("price", "review_scores", "number_of_reviews")
+RANKING_COLUMNS = ["_id", "name", "price", "review_scores", "number_of_reviews", "minimum_nights", "maximum_nights",
+                   "accommodates", "bedrooms", "beds", "bed_type"]
+TOP_N = 100
+
+
+class RankingIndex:
+    """Listings of every (country, property_type, room_type) group presorted by each ranking metric.
+
+    Built once per dataset version with one lexsort per metric and direction, so a top-k
+    query is a slice of precomputed positions. Ties go to the smaller _id and nulls come
+    last in both directions, the same order as table.select_rows.
+    """
+
+    def __init__(self, df, levels=RANKING_LEVELS, metrics=RANKING_METRICS):
+        self.levels = tuple(levels)
+        self.metrics = tuple(metrics)
+        grouped = df.groupby(list(self.levels), observed=True, sort=True)
+        codes = grouped.ngroup().to_numpy()
+        sizes = grouped.size()
+        starts = np.concatenate([[0], np.cumsum(sizes.to_numpy())[:-1]])
+        self._spans = {key if isinstance(key, tuple) else (key,): (start, start + size)
+                       for key, start, size in zip(sizes.index, starts, sizes.to_numpy())}
+
+        # rows with a null level have no group (code -1) and are left out
+        rows = np.flatnonzero(codes >= 0)
+        if "_id" in df:
+            tiebreak = np.empty(len(df), dtype=np.int64)
+            tiebreak[np.argsort(df["_id"].to_numpy(), kind="stable")] = np.arange(len(df))
+        else:
+            tiebreak = np.arange(len(df))
+        self._orders = {}
+        for metric in self.metrics:
+            values = df[metric].to_numpy(dtype=np.float64, na_value=np.nan)[rows]
+            for ascending in (True, False):
+                order = np.lexsort((tiebreak[rows], values if ascending else -values, codes[rows]))
+                self._orders[metric, ascending] = rows[order].astype(np.int32)
+
+    def positions(self, metric, k=TOP_N, ascending=False, *selected):
+        """Row positions of the k first listings of the selected group by metric."""
+        start, stop = self._spans.get(tuple(selected), (0, 0))
+        return self._orders[metric, ascending][start:min(stop, start + k)]
+
+    def take(self, df, metric, k=TOP_N, ascending=False, *selected):
+        return df.take(self.positions(metric, k, ascending, *selected))
@@ -0,0 +1,110 @@
+import threading
+
+import pandas as pd
+
+
+LISTING_DIMENSIONS = ("country", "room_type", "property_type", "host_response_time", "bed_type")
+LISTING_MEASURES = ("price", "review_scores", "number_of_reviews", "bedrooms", "beds", "accommodates",
+                    "minimum_nights", "maximum_nights", "availability_30", "availability_60", "availability_90",
+                    "availability_365")
+
+AVAILABILITY_DIMENSIONS = ("country", "property_type", "room_type", "bed_type", "is_location_exact")
+AVAILABILITY_MEASURES = ("availability_30", "availability_60", "availability_90", "availability_365")
+
+NEIGHBOURHOOD_DIMENSIONS = ("country", "property_type", "host_neighbourhood")
+HOST_LOCATION_DIMENSIONS = ("country", "property_type", "host_location")
+
+
+class RollupCube:
+    """Sum, count, min and max of each measure per combination of the dimension columns.
+
+    Charts filter and re-aggregate the cube cells instead of scanning the listings; means
+    are derived as sum / count so they match a groupby over the raw rows.
+    """
+
+    def __init__(self, df, dimensions, measures):
+        self.dimensions = tuple(dimensions)
+        self.measures = tuple(measures)
+        self.cells = self._aggregate(df)
+
+    @classmethod
+    def from_cells(cls, cells, dimensions, measures):
+        """Wrap cells aggregated elsewhere (e.g. by a database) so query() can re-aggregate them."""
+        cube = cls.__new__(cls)
+        cube.dimensions, cube.measures, cube.cells = tuple(dimensions), tuple(measures), cells
+        return cube
+
+    def _aggregate(self, df):
+        grouped = df.groupby(list(self.dimensions), observed=True, dropna=False)[list(self.measures)]
+        parts = [grouped.agg(kind).add_suffix(f"_{kind}") for kind in ("sum", "count", "min", "max")]
+        return pd.concat(parts, axis=1).reset_index()
+
+    def refresh(self, df, countries):
+        """Recompute only the cells of the given countries from the current listings."""
+        countries = set(countries)
+        kept = self.cells[~self.cells["country"].astype(str).isin(countries)]
+        fresh = self._aggregate(df[df["country"].astype(str).isin(countries)])
+        self.cells = pd.concat([kept, fresh], ignore_index=True)
+
+    def query(self, by, measures, agg="sum", **filters):
+        """Re-aggregate the cells matching the equality filters by one dimension.
+
+        With a single agg ("sum", "count", "mean", "min" or "max") the result columns are named
+        after the measures; with a list of aggs they are named "<measure>_<agg>".
+        """
+        cells = self.cells
+        for dimension, value in filters.items():
+            cells = cells[cells[dimension] == value]
+
+        aggs = [agg] if isinstance(agg, str) else list(agg)
+        grouped = cells.groupby(by, observed=True)
+        needed = {f"{measure}_{kind}" for measure in measures for kind in ("sum", "count")}
+        totals = grouped[sorted(needed)].sum()
+        for kind in {"min", "max"} & set(aggs):
+            columns = [f"{measure}_{kind}" for measure in measures]
+            totals[columns] = grouped[columns].agg(kind)
+
+        result = pd.DataFrame(index=totals.index)
+        for measure in measures:
+            for kind in aggs:
+                name = measure if isinstance(agg, str) else f"{measure}_{kind}"
+                if kind == "mean":
+                    result[name] = totals[f"{measure}_sum"] / totals[f"{measure}_count"]
+                else:
+                    result[name] = totals[f"{measure}_{kind}"]
+        return result.reset_index()
+
+
+def build_cubes(df):
+    return {
+        "listing": RollupCube(df, LISTING_DIMENSIONS, LISTING_MEASURES),
+        "availability": RollupCube(df, AVAILABILITY_DIMENSIONS, AVAILABILITY_MEASURES),
+        "host_neighbourhood": RollupCube(df, NEIGHBOURHOOD_DIMENSIONS, ["price"]),
+        "host_location": RollupCube(df, HOST_LOCATION_DIMENSIONS, ["price"]),
+    }
+
+
+class CubeStore:
+    """Keeps the cubes across dataset versions and refreshes only the countries whose partition changed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self.partitions = {}
+        self.cubes = None
+
+    def get(self, df, version, partitions):
+        """Return the cubes for this dataset version and the partition versions that went stale."""
+        with self._lock:
+            if version == self.version:
+                return self.cubes, set()
+            changed = {country for country in set(partitions) | set(self.partitions)
+                       if partitions.get(country) != self.partitions.get(country)}
+            if self.cubes is None or not partitions or not self.partitions:
+                self.cubes = build_cubes(df)
+            else:
+                for cube in self.cubes.values():
+                    cube.refresh(df, changed)
+            stale = {self.partitions[country] for country in changed if country in self.partitions}
+            self.version, self.partitions = version, dict(partitions)
+            return self.cubes, stale
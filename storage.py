@@ -0,0 +1,191 @@
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+DATASET_PATH = "Airbnbfinal.parquet"
+CSV_PATH = "Airbnbfinal.csv"
+
+PARTITION_COLUMNS = ["country"]
+
+CATEGORICAL_COLUMNS = ["country", "country_code", "market", "government_area", "suburb", "room_type",
+                       "property_type", "bed_type", "host_response_time", "cancellation_policy", "location_type",
+                       "is_location_exact", "host_is_superhost", "host_has_profile_pic", "host_identity_verified"]
+
+INTEGER_COLUMNS = ["minimum_nights", "maximum_nights", "accommodates", "bedrooms", "beds", "number_of_reviews",
+                   "bathrooms", "price", "extra_people", "guests_included", "cleaning_fee", "review_scores",
+                   "host_listings_count", "host_total_listings_count", "availability_30", "availability_60",
+                   "availability_90", "availability_365"]
+
+FLOAT_COLUMNS = ["host_response_rate", "longitude", "latitude"]
+
+# Columns read by Air.py; everything else stays on disk
+APP_COLUMNS = ["_id", "name", "country", "market", "street", "government_area", "location_type", "latitude",
+               "longitude", "is_location_exact", "property_type", "room_type", "bed_type", "accommodates",
+               "bedrooms", "beds", "minimum_nights", "maximum_nights", "price", "guests_included",
+               "cancellation_policy", "number_of_reviews", "review_scores", "host_name", "host_location",
+               "host_neighbourhood", "host_response_time", "host_is_superhost", "availability_30",
+               "availability_60", "availability_90", "availability_365"]
+
+
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def check_int32(series, column):
+    """Raise instead of letting an int32 cast wrap out-of-range values or truncate fractions."""
+    values = series.dropna()
+    if len(values) and (values.min() < INT32_MIN or values.max() > INT32_MAX or (values % 1 != 0).any()):
+        raise ValueError(f"{column} has values that do not fit int32, e.g. "
+                         f"{values[(values < INT32_MIN) | (values > INT32_MAX) | (values % 1 != 0)].iloc[0]}")
+
+
+def to_columnar(df):
+    """Apply the explicit schema: categoricals for low-cardinality fields, int32 counts and amounts."""
+    df = df.copy()
+    if "_id" in df:
+        # listingsAndReviews keys are strings; keep them that way so every backend orders them alike
+        df["_id"] = df["_id"].astype(str)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("category")
+    for column in INTEGER_COLUMNS:
+        if column in df and pd.api.types.is_integer_dtype(df[column]):
+            check_int32(df[column], column)
+            df[column] = df[column].astype("int32")
+    for column in FLOAT_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("float64")
+    for column in ("amenities", "host_verifications"):
+        if column in df and df[column].map(lambda value: isinstance(value, list)).any():
+            df[column] = df[column].map(str)
+    return df
+
+
+def column_type(field):
+    if field.name in INTEGER_COLUMNS:
+        return pa.int32()
+    if field.name in FLOAT_COLUMNS:
+        return pa.float64()
+    if field.name in CATEGORICAL_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if pa.types.is_null(field.type) or pa.types.is_large_string(field.type):
+        # an object column that is entirely null in this frame, or one pandas holds as pyarrow strings
+        return pa.string()
+    return field.type
+
+
+def to_table(df):
+    """Arrow table cast to the dataset schema, so partitions written at different times agree.
+
+    Integer columns holding nulls come out of pandas as float64 and are stored as nullable
+    int32 like the rest; values that do not fit raise rather than wrap.
+    """
+    df = to_columnar(df)
+    for column in INTEGER_COLUMNS:
+        if column in df:
+            check_int32(df[column], column)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table.cast(pa.schema([pa.field(field.name, column_type(field)) for field in table.schema]))
+
+
+def write_dataset(df, path=DATASET_PATH):
+    """Write the listings as a Parquet dataset partitioned by country, replacing any previous build."""
+    if os.path.isfile(path):
+        os.remove(path)
+    existing = set(partition_versions(path))
+    write_partitions(df, path, existing | set(df["country"].astype(str)))
+
+
+def partition_path(path, country):
+    return os.path.join(path, f"country={quote(str(country), safe='')}")
+
+
+def write_partitions(df, path, countries):
+    """Rewrite only the given country partitions; countries with no rows left are removed.
+
+    Apps read the dataset on every rerun, so nothing is written in place: the partitions are
+    built in a staging directory next to the dataset and each file is moved in with os.replace.
+    A reader sees the complete old or the complete new partition, never a half-written one.
+    """
+    countries = set(countries)
+    df = df[df["country"].astype(str).isin(countries)]
+    os.makedirs(path, exist_ok=True)
+    # a sibling of the dataset: on the same filesystem, but outside what readers list
+    root = os.path.abspath(path)
+    staging = tempfile.mkdtemp(prefix=f".{os.path.basename(root)}-", dir=os.path.dirname(root))
+    try:
+        if len(df):
+            pq.write_to_dataset(to_table(df), staging, partition_cols=PARTITION_COLUMNS)
+        for country in countries:
+            staged, target = partition_path(staging, country), partition_path(path, country)
+            if not os.path.isdir(staged):
+                if os.path.isdir(target):
+                    os.replace(target, os.path.join(staging, "removed"))
+                    shutil.rmtree(os.path.join(staging, "removed"))
+                continue
+            os.makedirs(target, exist_ok=True)
+            names = [f"part-{i}.parquet" for i in range(len(os.listdir(staged)))]
+            for name, staged_name in zip(names, sorted(os.listdir(staged))):
+                os.replace(os.path.join(staged, staged_name), os.path.join(target, name))
+            for name in set(os.listdir(target)) - set(names):
+                os.remove(os.path.join(target, name))
+    finally:
+        shutil.rmtree(staging)
+
+
+def read_dataset(path=DATASET_PATH, columns=None, filters=None):
+    """Read the dataset with column projection and memory-mapped files."""
+    table = pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+    return to_columnar(table.to_pandas())
+
+
+def load_listings(path=DATASET_PATH, columns=APP_COLUMNS, csv_path=CSV_PATH):
+    """Load the columnar dataset, falling back to the legacy CSV export when it has not been built."""
+    if os.path.exists(path):
+        return read_dataset(path, columns=columns)
+    usecols = (lambda column: column in columns) if columns else None
+    return to_columnar(pd.read_csv(csv_path, usecols=usecols))
+
+
+def file_version(target):
+    """Short token that changes whenever the file or directory tree at target is rewritten."""
+    if os.path.isdir(target):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(target) for name in names)
+    else:
+        files = [target]
+    stamps = [(os.path.relpath(name, target), os.stat(name).st_mtime_ns, os.stat(name).st_size) for name in files]
+    return hashlib.sha1(repr(stamps).encode()).hexdigest()[:12]
+
+
+def dataset_version(path=DATASET_PATH, csv_path=CSV_PATH):
+    return file_version(path if os.path.exists(path) else csv_path)
+
+
+def partition_versions(path=DATASET_PATH):
+    """Version token per country partition; empty when only the CSV export exists."""
+    if not os.path.isdir(path):
+        return {}
+    return {unquote(name.split("=", 1)[1]): file_version(os.path.join(path, name))
+            for name in sorted(os.listdir(path)) if name.startswith("country=")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the cleaned CSV export to a partitioned Parquet dataset")
+    parser.add_argument("source", nargs="?", default=CSV_PATH)
+    parser.add_argument("--output", default=DATASET_PATH)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.source)
+    write_dataset(df, args.output)
+    print(f"Wrote {len(df)} listings to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
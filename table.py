@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+
+TABLE_COLUMNS = ["name", "price", "room_type", "property_type", "accommodates", "bedrooms", "beds",
+                 "minimum_nights", "number_of_reviews", "review_scores", "market", "street", "government_area",
+                 "host_name", "host_neighbourhood", "cancellation_policy"]
+
+PAGE_SIZES = [25, 50, 100]
+
+LOCATION_TOP_N = 20
+
+
+def price_bands(low, high):
+    """The three price ranges offered by the Location Based tab, as (min, max) pairs."""
+    return [(low, high * 0.30), (high * 0.30, high * 0.60), (high * 0.60, high)]
+
+
+def select_rows(df, sort_by=None, ascending=True, offset=0, limit=None):
+    """Rows offset..offset+limit in (sort_by, _id) order; nulls sort last.
+
+    For numeric keys, np.partition finds the cut-off value first so only the rows up to
+    the end of the requested slice (plus ties) are sorted instead of the whole frame.
+    """
+    stop = len(df) if limit is None else offset + limit
+    if sort_by is None:
+        return df.iloc[offset:stop]
+    keys = [sort_by, "_id"] if "_id" in df and sort_by != "_id" else [sort_by]
+    values = df[sort_by].to_numpy()
+    if pd.api.types.is_numeric_dtype(df[sort_by]) and 0 < stop < len(df):
+        values = values.astype(np.float64)
+        cutoff = np.partition(values if ascending else -values, stop - 1)[stop - 1]
+        if not np.isnan(cutoff):
+            df = df[values <= cutoff] if ascending else df[values >= -cutoff]
+    df = df.sort_values(keys, ascending=[ascending] + [True] * (len(keys) - 1), kind="stable", na_position="last")
+    return df.iloc[offset:stop]
+
+
+def page_rows(df, columns=None, sort_by=None, ascending=True, page=0, page_size=50):
+    """One page of rows, sorted and projected before anything is sent to the browser."""
+    rows = select_rows(df, sort_by, ascending, page * page_size, page_size)
+    return (rows[columns] if columns else rows).reset_index(drop=True)
+
+
+def top_values(df, column, n=LOCATION_TOP_N, by=None):
+    """Listing count and average price for the n most common values of column.
+
+    With by, counts are split by that second column for stacked bars.
+    """
+    counts = df[column].value_counts().reset_index()
+    counts = counts.sort_values(["count", column], ascending=[False, True])
+    top = counts[column].head(n)
+    rows = df[df[column].isin(top)]
+    keys = [column] if by is None else [column, by]
+    result = rows.groupby(keys, observed=True).agg(listings=("price", "size"), average_price=("price", "mean"))
+    return result.reset_index().astype({column: str})
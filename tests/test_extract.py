@@ -0,0 +1,84 @@
+import math
+
+import mongomock
+import pandas as pd
+import pytest
+from bson.decimal128 import Decimal128
+
+from extract import COLUMNS, DECIMAL_COLUMNS, export_listings, iter_listing_chunks
+
+
+def listing(i):
+    return {
+        "_id": str(i), "name": f"Listing {i}", "property_type": "Apartment", "room_type": "Private room",
+        "price": Decimal128(f"{100 + i}.50"), "cleaning_fee": Decimal128("20.00"), "bathrooms": Decimal128("1.5"),
+        "extra_people": Decimal128("0.00"), "guests_included": Decimal128("2"), "minimum_nights": "2",
+        "images": {"picture_url": f"https://example.com/{i}.jpg"},
+        "review_scores": {"review_scores_rating": 90},
+        "host": {"host_id": f"h{i}", "host_response_time": "within an hour", "host_listings_count": 3},
+        "address": {"country": "Spain", "market": "Barcelona",
+                    "location": {"type": "Point", "coordinates": [2.17, 41.39], "is_location_exact": True}},
+        "availability": {"availability_30": 1, "availability_60": 2, "availability_90": 3, "availability_365": 4},
+        "amenities": ["Wifi", "Kitchen"],
+    }
+
+
+def collection(docs):
+    coll = mongomock.MongoClient().db.listingsAndReviews
+    if docs:
+        coll.insert_many(docs)
+    return coll
+
+
+def test_missing_nested_documents_flatten_to_nulls():
+    bare = {"_id": "bare", "name": "No nested documents"}
+    partial = dict(listing(1), host=None, address={"country": "Spain"}, review_scores={})
+    del partial["availability"]
+    chunks = list(iter_listing_chunks(collection([bare, partial])))
+
+    assert len(chunks) == 1
+    frame = chunks[0].set_index("_id")
+    assert list(chunks[0].columns) == COLUMNS
+    assert frame.loc["bare", "review_scores"] == 0
+    assert frame.loc["bare", "amenities"] == []
+    for column in ("images", "host_id", "country", "latitude", "longitude", "location_type", "availability_30"):
+        assert pd.isna(frame.loc["bare", column]), column
+    assert frame.loc["1", "country"] == "Spain"
+    assert frame.loc["1", "review_scores"] == 0
+    assert pd.isna(frame.loc["1", "host_id"]) and pd.isna(frame.loc["1", "longitude"])
+    assert pd.isna(frame.loc["1", "availability_365"])
+
+
+@pytest.mark.parametrize("rows, chunk_size, sizes", [(10, 5, [5, 5]), (11, 5, [5, 5, 1]), (4, 5, [4]), (0, 5, [])])
+def test_chunk_boundaries(rows, chunk_size, sizes):
+    chunks = list(iter_listing_chunks(collection([listing(i) for i in range(rows)]), batch_size=3,
+                                      chunk_size=chunk_size))
+
+    assert [len(chunk) for chunk in chunks] == sizes
+    ids = [value for chunk in chunks for value in chunk["_id"]]
+    assert sorted(ids, key=int) == [str(i) for i in range(rows)]
+
+
+def test_decimal_columns_become_float():
+    docs = [listing(i) for i in range(3)]
+    docs[1]["cleaning_fee"] = None
+    del docs[2]["bathrooms"]
+    frame = next(iter_listing_chunks(collection(docs))).set_index("_id")
+
+    for column in DECIMAL_COLUMNS:
+        assert frame[column].dtype == "float64", column
+    assert frame["price"].tolist() == [100.5, 101.5, 102.5]
+    assert math.isnan(frame.loc["1", "cleaning_fee"]) and math.isnan(frame.loc["2", "bathrooms"])
+    assert frame.loc["0", "bathrooms"] == 1.5
+
+
+@pytest.mark.parametrize("rows, chunk_size", [(10, 5), (11, 5)])
+def test_export_writes_one_header_and_every_row(tmp_path, rows, chunk_size):
+    path = tmp_path / "raw.csv"
+    total = export_listings(collection([listing(i) for i in range(rows)]), path, chunk_size=chunk_size)
+
+    exported = pd.read_csv(path)
+    assert total == rows == len(exported)
+    assert list(exported.columns) == COLUMNS
+    assert sorted(exported["_id"]) == list(range(rows))
+    assert exported["price"].sum() == pytest.approx(sum(100.5 + i for i in range(rows)))
@@ -0,0 +1,85 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import plotly.graph_objects as go
+
+from figure_cache import FigureCache
+
+
+def bar(n):
+    return go.Figure(go.Bar(x=list(range(n)), y=list(range(n))))
+
+
+def disk_files(path):
+    return sorted(name for name in os.listdir(path) if name.endswith(".json"))
+
+
+def test_hit_returns_the_built_figure_without_rebuilding():
+    cache = FigureCache()
+    builds = []
+    first = cache.get_or_build("chart", ("Spain", 1), "v1", lambda: builds.append(1) or bar(5))
+    second = cache.get_or_build("chart", ("Spain", 1), "v1", lambda: builds.append(1) or bar(5))
+    assert second is first
+    assert len(builds) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_memory_tier_evicts_least_recently_used():
+    size = len(bar(50).to_json())
+    cache = FigureCache(max_bytes=int(size * 2.5))
+    for name in ("a", "b", "c"):
+        cache.get_or_build(name, (), "v1", lambda: bar(50))
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+    assert cache.get(cache.key("a", (), "v1")) is None
+
+
+def test_disk_tier_survives_restart_and_is_bounded(tmp_path):
+    cache = FigureCache(disk_dir=tmp_path)
+    cache.get_or_build("chart", ("Spain",), "v1", lambda: bar(20))
+    restarted = FigureCache(disk_dir=tmp_path)
+    figure = restarted.get_or_build("chart", ("Spain",), "v1", lambda: bar(1))
+    assert len(figure.data[0].x) == 20
+    assert restarted.stats()["disk_hits"] == 1
+
+    size = os.path.getsize(tmp_path / disk_files(tmp_path)[0])
+    bounded = FigureCache(disk_dir=tmp_path, max_disk_bytes=size * 3)
+    for i in range(6):
+        bounded.get_or_build("chart", (i,), "v1", lambda: bar(20))
+    assert len(disk_files(tmp_path)) == 3
+    assert bounded.stats()["disk_bytes"] <= size * 3
+    assert bounded.stats()["disk_evictions"] == 4
+    # a fresh process trims an oversized directory on start
+    FigureCache(disk_dir=tmp_path, max_disk_bytes=size)
+    assert len(disk_files(tmp_path)) == 1
+
+
+def test_invalidate_removes_memory_and_disk_entries_of_stale_versions(tmp_path):
+    cache = FigureCache(disk_dir=tmp_path)
+    cache.get_or_build("chart", ("Spain",), "spain-1", lambda: bar(5))
+    cache.get_or_build("chart", ("Brazil",), "brazil-1", lambda: bar(5))
+    cache.invalidate({"spain-1"})
+
+    assert cache.stats()["entries"] == 1 and len(disk_files(tmp_path)) == 1
+    assert cache.get(cache.key("chart", ("Spain",), "spain-1")) is None
+    assert cache.get(cache.key("chart", ("Brazil",), "brazil-1")) is not None
+
+
+def test_concurrent_puts_of_one_key_all_succeed(tmp_path):
+    cache = FigureCache(disk_dir=tmp_path)
+    key = cache.key("chart", ("Spain",), "v1")
+    figure = bar(2000)
+    payload = figure.to_json()
+    barrier = threading.Barrier(8)
+
+    def put():
+        barrier.wait()
+        for _ in range(20):
+            cache.put(key, figure, payload)
+
+    with ThreadPoolExecutor(8) as pool:
+        for future in [pool.submit(put) for _ in range(8)]:
+            future.result()
+    assert disk_files(tmp_path) == [cache._file_name(key)]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+    assert cache.stats()["disk_bytes"] == len(payload)
@@ -0,0 +1,15 @@
+from benchmarks.data import make_listings
+from geo import EXACT_ZOOM, MAX_POINTS, map_figure, view_bounds
+
+
+def test_exact_map_shows_the_listings_in_view():
+    # listings sit around a handful of cities, so the mean of all of them is in open ocean
+    df = make_listings(2000)
+    for zoom in (EXACT_ZOOM, 12):
+        fig = map_figure(df, zoom)
+        centre = fig.layout.mapbox.center
+        bounds = view_bounds({"lat": centre.lat, "lon": centre.lon}, zoom)
+        in_view = df[df["latitude"].between(*bounds["latitude"]) & df["longitude"].between(*bounds["longitude"])]
+        assert len(in_view) > 0
+        assert len(fig.data[0].lat) == min(len(in_view), MAX_POINTS)
+        assert f"of {len(in_view)} in view" in fig.layout.title.text
@@ -0,0 +1,112 @@
+import datetime
+
+import mongomock
+import pytest
+
+from benchmarks.data import make_documents
+from benchmarks.generate import build_dataset
+import ingest
+from ingest import apply_change_events, initial_state, load_state, save_state, supports_change_streams, sync
+from storage import partition_versions, read_dataset
+
+
+@pytest.fixture
+def listings(tmp_path):
+    """A collection, the dataset built from it and the path of the ingest state file."""
+    coll = mongomock.MongoClient().db.listingsAndReviews
+    coll.insert_many(make_documents(200))
+    path = str(tmp_path / "listings.parquet")
+    build_dataset(path, rows=200)
+    return coll, path, str(tmp_path / "state.json")
+
+
+def newer(coll, doc, **changes):
+    """doc as re-scraped after everything in the collection, with the given fields changed."""
+    latest = coll.find_one(sort=[("last_scraped", -1)])["last_scraped"]
+    return dict(doc, last_scraped=latest + datetime.timedelta(minutes=1), **changes)
+
+
+def test_sync_after_export_only_upserts_later_changes(listings):
+    coll, path, state_path = listings
+    save_state(initial_state(coll), state_path)
+    versions = partition_versions(path)
+
+    assert sync(coll, path, state_path) == set()
+    assert partition_versions(path) == versions
+
+    doc = coll.find_one({"address.country": "Spain"})
+    coll.replace_one({"_id": doc["_id"]}, newer(coll, doc, name="Renamed"))
+    assert sync(coll, path, state_path) == {"Spain"}
+    assert {country: version for country, version in partition_versions(path).items() if country != "Spain"} == \
+        {country: version for country, version in versions.items() if country != "Spain"}
+    assert read_dataset(path, filters=[("_id", "=", doc["_id"])])["name"].tolist() == ["Renamed"]
+
+
+def test_first_sync_without_state_seeds_it_instead_of_reupserting(listings):
+    coll, path, state_path = listings
+    versions = partition_versions(path)
+
+    assert sync(coll, path, state_path) == set()
+    assert partition_versions(path) == versions
+    latest = coll.find_one(sort=[("last_scraped", -1), ("_id", -1)])
+    assert load_state(state_path)["last_id"] == latest["_id"]
+
+
+def event(operation, doc_id, doc=None):
+    return {"operationType": operation, "documentKey": {"_id": doc_id}, "fullDocument": doc}
+
+
+def test_simulated_change_feed(listings):
+    coll, path, _ = listings
+    spain = list(coll.find({"address.country": "Spain"}, limit=3))
+    brazil = coll.find_one({"address.country": "Brazil"})
+    inserted = dict(make_documents(201)[200], _id="new")
+    inserted["address"] = dict(inserted["address"], country="Portugal")
+    moved = dict(spain[1], address=dict(spain[1]["address"], country="Turkey"))
+    versions = partition_versions(path)
+    before = read_dataset(path)
+
+    countries = apply_change_events([
+        event("insert", "new", inserted),
+        event("update", spain[0]["_id"], dict(spain[0], name="First name")),
+        event("update", spain[0]["_id"], dict(spain[0], name="Updated")),
+        event("replace", moved["_id"], moved),
+        event("delete", brazil["_id"]),
+        event("update", spain[2]["_id"], None),
+    ], path)
+
+    after = read_dataset(path).set_index("_id")
+    assert countries == {"Portugal", "Spain", "Turkey", "Brazil"}
+    assert after.loc["new", "country"] == "Portugal"
+    assert after.loc[spain[0]["_id"], "name"] == "Updated"
+    assert after.loc[moved["_id"], "country"] == "Turkey"
+    # a deleted document, or one gone by the time the update was looked up, is dropped
+    assert brazil["_id"] not in after.index and spain[2]["_id"] not in after.index
+    assert len(after) == len(before) + 1 - 2
+    for country, version in versions.items():
+        if country not in countries:
+            assert partition_versions(path)[country] == version
+
+
+def test_missing_change_streams_fall_back_to_polling(listings):
+    coll, path, state_path = listings
+    save_state(dict(initial_state(coll), resume_token={"_data": "stale"}), state_path)
+    doc = coll.find_one({"address.country": "Spain"})
+    coll.replace_one({"_id": doc["_id"]}, newer(coll, doc, name="Polled"))
+
+    assert not supports_change_streams(coll)
+    assert sync(coll, path, state_path) == {"Spain"}
+    assert "resume_token" not in load_state(state_path)
+
+
+def test_stream_errors_are_not_mistaken_for_missing_change_streams(listings, monkeypatch):
+    coll, path, state_path = listings
+    save_state(dict(initial_state(coll), resume_token={"_data": "token"}), state_path)
+
+    def broken(*args, **kwargs):
+        raise TypeError("bug in the stream handling")
+    monkeypatch.setattr(ingest, "supports_change_streams", lambda coll: True)
+    monkeypatch.setattr(ingest, "sync_from_stream", broken)
+    with pytest.raises(TypeError, match="bug"):
+        sync(coll, path, state_path)
+    assert load_state(state_path)["resume_token"] == {"_data": "token"}
@@ -0,0 +1,19 @@
+from instrumentation import Instrumentation
+
+
+def test_max_rss_delta_never_goes_down():
+    perf = Instrumentation()
+    for delta in (None, 0, -4096, None, -8192):
+        perf.record("load", 0.01, delta, step="dataset")
+    assert perf.summary()[0]["max_rss_delta_mb"] == 0
+    perf.record("load", 0.01, 4096, step="dataset")
+    perf.record("load", 0.01, -4096, step="dataset")
+    assert perf.summary()[0]["max_rss_delta_mb"] == 4096 / 2 ** 20
+
+
+def test_max_rss_delta_stays_unset_without_memory_tracking():
+    perf = Instrumentation(track_memory=False)
+    with perf.span("tab", tab="Price"):
+        pass
+    assert perf.summary()[0]["max_rss_delta_mb"] is None
+    assert "airbnb_span_rss_delta_bytes_max{" not in perf.prometheus()
@@ -0,0 +1,165 @@
+"""Every query backend returns the same chart data as the pandas path.
+
+Synthetic listingsAndReviews documents go into an in-memory MongoDB (mongomock), are
+exported and cleaned into a Parquet dataset, and every chart query of Air.py is run
+against the pandas, DuckDB and MongoDB backends.
+"""
+import mongomock
+import pandas as pd
+import pytest
+
+from benchmarks.data import make_documents
+from cleaning import clean_listings
+from extract import iter_listing_chunks
+from filter_index import FilterIndex
+from geo import EXACT_ZOOM, densest_centre, view_bounds
+from query_backend import DuckDBBackend, MongoBackend, PandasBackend
+from ranking import RANKING_METRICS, RankingIndex
+from rollup import build_cubes
+from storage import load_listings, write_dataset
+from table import TABLE_COLUMNS, price_bands
+
+
+def chart_queries(backend, max_combinations):
+    """(name, call) pairs for the queries the five tabs make, over the filter combinations of backend."""
+    # the map's default "All" selection queries without filters
+    queries = [("countries", lambda b: b.options("country")), ("count all", lambda b: b.count()),
+               ("all points", lambda b: b.map_points(300)), ("all cells", lambda b: b.grid_cells(1)),
+               ("all markets", lambda b: b.options("market"))]
+    combinations = 0
+    for country in backend.options("country"):
+        queries += [
+            (f"room types {country}", lambda b, c=country: b.options("room_type", country=c)),
+            (f"property types {country}", lambda b, c=country: b.options("property_type", country=c)),
+            (f"cells {country}", lambda b, c=country: b.grid_cells(4, country=c)),
+            (f"points {country}", lambda b, c=country: b.map_points(200, country=c)),
+            (f"markets {country}", lambda b, c=country: b.options("market", country=c)),
+        ]
+        # the exact map: the view at the deepest zoom around the densest cell of the first market
+        market = backend.options("market", country=country)[0]
+        view = {"country": country, **view_bounds(densest_centre(backend.grid_cells(12, market=market, country=country)), 12)}
+        queries += [
+            (f"market cells {country}", lambda b, c=country, m=market: b.grid_cells(12, market=m, country=c)),
+            (f"view points {country}", lambda b, f=view: b.map_points(200, **f)),
+            (f"view count {country}", lambda b, f=view: b.count(**f)),
+        ]
+        for property_type in backend.options("property_type", country=country):
+            if combinations == max_combinations:
+                return queries
+            combinations += 1
+            filters = {"country": country, "property_type": property_type}
+            stats = backend.aggregate("property_type", ["price"], ["min", "max"], **filters).iloc[0]
+            band = price_bands(stats["price_min"], stats["price_max"])[0]
+            name = f"{country}/{property_type}"
+            queries += [
+                (f"availability {name}", lambda b, f=filters: b.aggregate(
+                    ["room_type", "bed_type", "is_location_exact"],
+                    ["availability_30", "availability_60", "availability_90", "availability_365"], **f)),
+                (f"price stats {name}", lambda b, f=filters: b.aggregate("property_type", ["price"], ["min", "max"], **f)),
+                (f"neighbourhoods {name}", lambda b, f=filters: b.aggregate("host_neighbourhood", ["price"], ["sum", "mean"], **f)),
+                (f"host locations {name}", lambda b, f=filters: b.aggregate("host_location", ["price"], ["sum", "mean"], **f)),
+                (f"price band rooms {name}", lambda b, f=filters, p=band: b.options("room_type", price=p, **f)),
+                (f"price band count {name}", lambda b, f=filters, p=band: b.count(price=p, **f)),
+                (f"table {name}", lambda b, f=filters, p=band: b.rows(TABLE_COLUMNS, "price", False, 0, 50, price=p, **f)),
+                (f"table by name {name}", lambda b, f=filters: b.rows(TABLE_COLUMNS, "name", True, 25, 25, **f)),
+                (f"market {name}", lambda b, f=filters, p=band: b.top_values("street", price=p, **f)),
+                (f"government area {name}", lambda b, f=filters: b.top_values("government_area", by="cancellation_policy", **f)),
+                (f"exact points {name}", lambda b, f=filters: b.map_points(50, **f)),
+            ]
+            for room_type in backend.options("room_type", **filters):
+                room = {**filters, "room_type": room_type}
+                queries += [
+                    (f"property prices {name}/{room_type}", lambda b, c=country, r=room_type: b.aggregate(
+                        "property_type", ["price", "review_scores", "number_of_reviews"], country=c, room_type=r)),
+                    (f"host response {name}/{room_type}", lambda b, f=room: b.aggregate(
+                        "host_response_time", ["availability_30", "availability_60", "availability_90",
+                                               "availability_365", "price"], **f)),
+                    (f"bed types {name}/{room_type}", lambda b, f=room: b.aggregate(
+                        "bed_type", ["minimum_nights", "maximum_nights", "bedrooms", "beds", "accommodates", "price"], **f)),
+                ]
+                queries += [(f"top {metric} {name}/{room_type}", lambda b, f=room, m=metric, a=ascending: b.top_listings(
+                                m, 20, a, **f))
+                            for metric in RANKING_METRICS for ascending in (True, False)]
+    queries.append(("all cells", lambda b: b.grid_cells(EXACT_ZOOM - 1)))
+    return queries
+
+
+def same(expected, actual):
+    if isinstance(expected, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual.reset_index(drop=True),
+                                          check_dtype=False, check_exact=False, rtol=1e-9)
+        except AssertionError as error:
+            return str(error)
+        return None
+    if isinstance(expected, list):
+        actual = list(actual)
+    return None if expected == actual else f"{expected!r} != {actual!r}"
+
+
+ROWS = 600
+COMBINATIONS = 6
+
+
+@pytest.fixture(scope="module")
+def listings(tmp_path_factory):
+    coll = mongomock.MongoClient().sample_airbnb.listingsAndReviews
+    coll.insert_many(make_documents(ROWS))
+    path = str(tmp_path_factory.mktemp("parity") / "Airbnbfinal.parquet")
+    write_dataset(clean_listings(pd.concat(iter_listing_chunks(coll), ignore_index=True)), path)
+    df = load_listings(path)
+    indexes = [FilterIndex(df, ("country", "room_type", "property_type", "host_response_time")),
+               FilterIndex(df, ("country", "property_type", "room_type"))]
+    reference = PandasBackend(df, build_cubes(df), indexes, path, RankingIndex(df))
+    queries = chart_queries(reference, COMBINATIONS)
+    return coll, df, path, queries, [call(reference) for _, call in queries]
+
+
+BACKENDS = {
+    "pandas without cubes": lambda coll, df, path: PandasBackend(df, path=path),
+    "duckdb": lambda coll, df, path: DuckDBBackend(path),
+    # mongomock reports MongoDB 5.0 but has no $setWindowFields
+    "mongodb": lambda coll, df, path: MongoBackend(coll, window_functions=False),
+}
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_backend_matches_pandas(listings, name):
+    coll, df, path, queries, expected = listings
+    backend = BACKENDS[name](coll, df, path)
+    mismatches = [(query, same(value, call(backend))) for (query, call), value in zip(queries, expected)]
+    mismatches = [f"{query}: {error}" for query, error in mismatches if error]
+    assert not mismatches, f"{len(mismatches)}/{len(queries)} queries differ:\n" + "\n".join(mismatches[:5])
+
+
+class WindowFields:
+    """mongomock collection that runs $setWindowFields {$documentNumber} stages, which mongomock lacks."""
+
+    def __init__(self, coll):
+        self.coll = coll
+        self.database = coll.database
+        self.window_stages = 0
+
+    def aggregate(self, pipeline, **kwargs):
+        stages = [index for index, stage in enumerate(pipeline) if "$setWindowFields" in stage]
+        if not stages:
+            return self.coll.aggregate(pipeline, **kwargs)
+        self.window_stages += 1
+        window = pipeline[stages[0]]["$setWindowFields"]
+        (key, direction), = window["sortBy"].items()
+        (output, _), = window["output"].items()
+        docs = sorted(self.coll.aggregate(pipeline[:stages[0]]), key=lambda doc: doc[key], reverse=direction < 0)
+        numbered = mongomock.MongoClient().db.numbered
+        numbered.insert_many([{**doc, output: position} for position, doc in enumerate(docs, 1)])
+        return numbered.aggregate(pipeline[stages[0] + 1:], **kwargs)
+
+
+def test_mongo_points_are_strided_on_the_server(listings):
+    coll, df, path, _, _ = listings
+    windowed = WindowFields(coll)
+    backend = MongoBackend(windowed, window_functions=True)
+    reference = PandasBackend(df, path=path)
+    for filters in ({}, {"country": reference.options("country")[0]}):
+        same_points = same(reference.map_points(10, **filters), backend.map_points(10, **filters))
+        assert same_points is None, same_points
+    assert windowed.window_stages == 2
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rollup import LISTING_DIMENSIONS, LISTING_MEASURES, CubeStore, RollupCube, build_cubes
+from storage import to_columnar
+
+AGGS = ["sum", "mean", "min", "max"]
+MEASURES = ["price", "review_scores", "bedrooms", "availability_365"]
+# (filter columns, group-by column) of each chart served from the listing cube
+QUERIES = [(("country", "room_type"), "property_type"),
+           (("country", "room_type", "property_type"), "host_response_time"),
+           (("country", "room_type", "property_type", "host_response_time"), "bed_type")]
+
+
+def make_frame(rows=3000, seed=0, countries=("Spain", "Brazil", "Portugal", "Turkey")):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "_id": np.arange(rows).astype(str),
+        "country": rng.choice(countries, rows),
+        "room_type": rng.choice(["Entire home/apt", "Private room", "Shared room"], rows),
+        "property_type": rng.choice(["Apartment", "House", "Loft", "Villa"], rows),
+        "host_response_time": rng.choice(["within an hour", "within a day"], rows).astype(object),
+        "bed_type": rng.choice(["Real Bed", "Futon", "Couch"], rows).astype(object),
+        "is_location_exact": rng.choice([True, False], rows),
+        "host_neighbourhood": rng.choice(["Centre", "Old Town", "Harbour"], rows),
+        "host_location": rng.choice(["Here", "Elsewhere"], rows),
+    })
+    for measure in LISTING_MEASURES:
+        df[measure] = rng.integers(0, 500, rows).astype(float)
+    # NaN measures, including a whole group with nothing but NaNs, and NaN dimensions
+    df.loc[rng.random(rows) < 0.1, "price"] = np.nan
+    df.loc[rng.random(rows) < 0.3, "review_scores"] = np.nan
+    df.loc[(df["country"] == countries[0]) & (df["property_type"] == "Villa"), "bedrooms"] = np.nan
+    df.loc[rng.random(rows) < 0.05, "host_response_time"] = np.nan
+    df.loc[rng.random(rows) < 0.05, "bed_type"] = np.nan
+    return df
+
+
+def expected(df, filters, by, agg):
+    mask = np.ones(len(df), dtype=bool)
+    for column, value in filters.items():
+        mask &= (df[column] == value).to_numpy()
+    return df[mask].groupby(by, observed=True)[MEASURES].agg(agg).reset_index()
+
+
+def assert_matches(cube, df):
+    for columns, by in QUERIES:
+        # the selectboxes only offer values that occur, so every filter value is non-null
+        for values in df[list(columns)].dropna().drop_duplicates().itertuples(index=False):
+            filters = dict(zip(columns, values))
+            for agg in AGGS:
+                got = cube.query(by, MEASURES, agg, **filters)
+                want = expected(df, filters, by, agg)
+                pd.testing.assert_frame_equal(
+                    got.astype({by: str}).sort_values(by).reset_index(drop=True),
+                    want.astype({by: str}).sort_values(by).reset_index(drop=True),
+                    check_dtype=False, check_categorical=False, obj=f"{agg} by {by} where {filters}")
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_cube_matches_groupby_for_every_combination(columnar):
+    df = make_frame()
+    if columnar:
+        df = to_columnar(df)
+    assert_matches(RollupCube(df, LISTING_DIMENSIONS, LISTING_MEASURES), df)
+
+
+def test_multiple_aggs_are_suffixed():
+    df = make_frame(500)
+    result = RollupCube(df, LISTING_DIMENSIONS, LISTING_MEASURES).query("country", ["price"], ["mean", "max"])
+    assert list(result.columns) == ["country", "price_mean", "price_max"]
+    want = df.groupby("country")["price"].agg(["mean", "max"]).reset_index()
+    np.testing.assert_allclose(result.sort_values("country")[["price_mean", "price_max"]],
+                               want.sort_values("country")[["mean", "max"]])
+
+
+def test_store_refreshes_only_changed_countries():
+    before = make_frame(seed=1)
+    partitions = {country: f"{country}-1" for country in before["country"].unique()}
+    store = CubeStore()
+    cubes, stale = store.get(before, "v1", partitions)
+    assert stale == set()
+    assert store.get(before, "v1", partitions) == (cubes, set())
+
+    # Spain's listings change, Turkey's partition is removed and Canada's is added
+    after = before[before["country"] != "Turkey"].copy()
+    spain = after["country"] == "Spain"
+    after.loc[spain, "price"] = after.loc[spain, "price"] * 2 + 1
+    canada = make_frame(200, seed=2, countries=("Canada",))
+    after = pd.concat([after, canada], ignore_index=True)
+    new_partitions = dict(partitions, Spain="Spain-2", Canada="Canada-1")
+    del new_partitions["Turkey"]
+
+    refreshed, stale = store.get(after, "v2", new_partitions)
+    assert refreshed is cubes
+    assert stale == {"Spain-1", "Turkey-1"}
+    assert_matches(refreshed["listing"], after)
+    rebuilt = build_cubes(after)
+    for name, cube in refreshed.items():
+        pd.testing.assert_frame_equal(
+            cube.query("country", cube.measures, ["sum", "count", "min", "max"]).sort_values("country")
+                .reset_index(drop=True),
+            rebuilt[name].query("country", cube.measures, ["sum", "count", "min", "max"]).sort_values("country")
+                .reset_index(drop=True),
+            check_dtype=False, obj=name)
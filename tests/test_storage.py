@@ -0,0 +1,79 @@
+import glob
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from benchmarks.data import make_documents
+from benchmarks.generate import build_dataset
+from ingest import apply_changes
+from storage import INTEGER_COLUMNS, read_dataset, to_columnar, write_dataset, write_partitions
+
+
+def file_schemas(path):
+    return {os.path.relpath(name, path): pq.read_schema(name).remove_metadata()
+            for name in glob.glob(os.path.join(path, "*", "*.parquet"))}
+
+
+def test_rewritten_partitions_keep_the_dataset_schema(tmp_path):
+    path = str(tmp_path / "listings.parquet")
+    build_dataset(path, rows=300)
+    before = file_schemas(path)
+    schema = next(iter(before.values()))
+    assert len(set(map(str, before.values()))) == 1
+    for column in INTEGER_COLUMNS:
+        assert schema.field(column).type == pa.int32(), column
+
+    # fields missing from a changed listing come back as nulls in otherwise integer columns
+    doc = make_documents(301)[300]
+    del doc["accommodates"]
+    del doc["host"]["host_listings_count"]
+    doc["host"]["host_neighbourhood"] = None
+    countries = apply_changes([doc], path=path)
+
+    after = file_schemas(path)
+    assert countries == {doc["address"]["country"]}
+    assert len(after) == len(before)
+    assert all(str(value) == str(schema) for value in after.values())
+    changed = read_dataset(path, filters=[("_id", "=", doc["_id"])])
+    assert changed["accommodates"].isna().all() and changed["host_listings_count"].isna().all()
+
+
+def test_out_of_range_integers_raise_instead_of_wrapping(tmp_path):
+    df = pd.DataFrame({"_id": ["1", "2"], "country": ["Spain", "Spain"], "price": [10, 2 ** 31]})
+    with pytest.raises(ValueError, match="price"):
+        to_columnar(df)
+    with pytest.raises(ValueError, match="accommodates"):
+        write_dataset(df.assign(price=[10, 20], accommodates=[np.nan, -2.0 ** 40]), str(tmp_path / "out"))
+    with pytest.raises(ValueError, match="beds"):
+        write_dataset(df.assign(price=[10, 20], beds=[1.5, np.nan]), str(tmp_path / "out"))
+
+
+def test_readers_never_see_a_partition_being_rewritten(tmp_path):
+    path = str(tmp_path / "listings.parquet")
+    build_dataset(path, rows=600)
+    df = read_dataset(path)
+    countries = df["country"].astype(str)
+    expected = countries.value_counts().to_dict()
+    done = threading.Event()
+
+    def rewrite():
+        try:
+            for price in range(20):
+                write_partitions(df.assign(price=price), path, set(countries))
+        finally:
+            done.set()
+
+    writer = threading.Thread(target=rewrite)
+    writer.start()
+    reads = 0
+    while not done.is_set() or not reads:
+        # every read sees each country whole, from one build or the next
+        assert read_dataset(path, columns=["country"])["country"].astype(str).value_counts().to_dict() == expected
+        reads += 1
+    writer.join()
+    assert read_dataset(path, columns=["price"])["price"].eq(19).all()